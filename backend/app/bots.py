@@ -6,7 +6,7 @@ import logging
 
 # Import models, base bot class, and auth dependency
 from ..models.bot_models import (
-    BotConfigCreate, BotConfigUpdate, BotConfigResponse, BotStatusResponse
+    BotConfigCreate, BotConfigUpdate, BotConfigResponse, BotConfigResponseList, BotStatusResponse
 )
 from ..bots.base_bot import BaseTradingBot
 from ..utils.auth import get_current_user
@@ -18,8 +18,6 @@ from typing import Optional # Needed for Optional in helper function signature
 # --- Bot Instance Management (In-Memory) ---
 running_bots: Dict[str, BaseTradingBot] = {}
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -28,7 +26,7 @@ router = APIRouter()
 async def _get_bot_config_from_db(bot_id: uuid.UUID, user_id: str, supabase_client = None) -> Optional[Dict[str, Any]]:
     """Fetches bot config from DB, ensuring user ownership."""
     if not supabase_client:
-        supabase_client = await get_supabase_backend_client() 
+        supabase_client = get_supabase_backend_client() 
     try:
         response = supabase_client.table('bot_configs').select("*").eq('id', str(bot_id)).eq('user_id', user_id).maybe_single().execute()
         if response.data:
@@ -64,7 +62,7 @@ async def create_bot_configuration(
     current_user_id: str = Depends(get_current_user)
 ):
     logger.info(f"Received request to create bot config: {bot_data.name} ({bot_data.bot_type}) for user {current_user_id}")
-    supabase = await get_supabase_backend_client()
+    supabase = get_supabase_backend_client()
     user_uuid = uuid.UUID(current_user_id) # Convert to UUID
     
     try:
@@ -93,7 +91,7 @@ async def create_bot_configuration(
              # Do not raise here, let the bot insert fail if user truly doesn't exist
 
         # --- Insert Bot Config ---
-        insert_data = bot_data.dict()
+        insert_data = bot_data.model_dump()
         # Use string representation of UUID for insert data
         insert_data['user_id'] = str(user_uuid) 
         
@@ -126,17 +124,13 @@ async def create_bot_configuration(
 @router.get("", response_model=List[BotConfigResponse], tags=["Bots"], summary="List user's bot configurations")
 async def list_bot_configurations(current_user_id: str = Depends(get_current_user)):
     logger.info(f"Fetching all bot configurations for user {current_user_id}")
-    supabase = await get_supabase_backend_client()
+    supabase = get_supabase_backend_client()
     try:
         response = supabase.table('bot_configs').select("*").eq('user_id', current_user_id).execute()
         # supabase-py v2 raises error on failure, so check data directly
-        configs_data = []
-        if response.data:
-            for config in response.data:
-                 config['id'] = uuid.UUID(config['id'])
-                 config['user_id'] = uuid.UUID(str(config['user_id']))
-                 configs_data.append(BotConfigResponse(**config))
-        return configs_data
+        if not response.data:
+            return []
+        return BotConfigResponseList.validate_python(response.data)
     except Exception as e:
         logger.error(f"Error fetching bot configs for user {current_user_id}: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error fetching bot configurations.")
@@ -155,9 +149,9 @@ async def update_bot_configuration(
     update_data: BotConfigUpdate,
     current_user_id: str = Depends(get_current_user)
 ):
-    logger.info(f"Updating bot configuration {bot_id} for user {current_user_id} with data: {update_data.dict(exclude_unset=True)}")
-    supabase = await get_supabase_backend_client()
-    update_payload = update_data.dict(exclude_unset=True) 
+    logger.info(f"Updating bot configuration {bot_id} for user {current_user_id} with data: {update_data.model_dump(exclude_unset=True)}")
+    supabase = get_supabase_backend_client()
+    update_payload = update_data.model_dump(exclude_unset=True) 
     if not update_payload: raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No update data provided.")
     update_payload['updated_at'] = 'now()' 
     try:
@@ -190,7 +184,7 @@ async def delete_bot_configuration(
     background_tasks: BackgroundTasks = BackgroundTasks()
 ):
     logger.info(f"Request to delete bot configuration {bot_id} for user {current_user_id}")
-    supabase = await get_supabase_backend_client()
+    supabase = get_supabase_backend_client()
     
     bot_instance = running_bots.get(str(bot_id))
     if bot_instance:
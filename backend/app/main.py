@@ -5,11 +5,16 @@ import datetime # For timestamp
 import json # For creating JSON messages
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, status 
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from typing import List, Dict, Set, Optional 
 from dotenv import load_dotenv
 from ..utils.binance_client import get_current_price 
+from ..utils.logging_setup import setup_logging
+from ..utils.binance_async import close_http_client
+from ..utils.db_client import close_db_buffers, close_pg_pool
+from ..utils.auth import decode_supabase_token
 from .bots import running_bots 
-from jose import jwt, JWTError 
+from jose import JWTError 
 # Import WebSocketState for connection checks
 from starlette.websockets import WebSocketState 
 
@@ -22,11 +27,15 @@ SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
 if not SUPABASE_JWT_SECRET:
      raise EnvironmentError("SUPABASE_JWT_SECRET environment variable not set.")
 
+# --- Logging (queue-based, writes happen off the event loop thread) ---
+setup_logging()
+
 # --- App Initialization ---
 app = FastAPI(
     title="Trading Bots API",
     description="API for managing trading bots and market data.",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse # orjson serializes status/config lists (UUIDs, floats) much faster than stdlib json
 )
 
 # --- CORS Configuration ---
@@ -40,6 +49,12 @@ app.add_middleware(
     allow_headers=["*"], 
 )
 
+@app.on_event("shutdown")
+async def shutdown_http_clients():
+    await close_db_buffers() # Write out buffered trades/snapshots and stop their flushers before the process exits
+    await close_pg_pool()
+    await close_http_client()
+
 # --- Basic Root Endpoint ---
 @app.get("/", tags=["Health Check"])
 async def read_root():
@@ -145,7 +160,7 @@ async def authenticate_websocket(websocket: WebSocket) -> Optional[str]:
         token = message["token"]
         
         try:
-            payload = jwt.decode(token, SUPABASE_JWT_SECRET, algorithms=["HS256"], audience="authenticated")
+            payload = decode_supabase_token(token)
             user_id: str = payload.get("sub")
             if user_id is None: raise JWTError("Token payload missing 'sub'")
             print(f"WebSocket authenticated for user: {user_id} using JWT Secret.")
@@ -224,4 +239,5 @@ if __name__ == "__main__":
     print(f"Starting Uvicorn server on {host}:{port}")
     print(f"Allowing CORS origins: {origins}")
     
-    uvicorn.run("main:app", host=host, port=port, reload=True)
+    # uvicorn creates the event loop before importing the app; "auto" runs it on uvloop when installed (not on Windows)
+    uvicorn.run("main:app", host=host, port=port, reload=True, loop="auto")
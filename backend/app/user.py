@@ -9,8 +9,6 @@ from ..utils.db_client import get_supabase_backend_client # Import Supabase clie
 
 router = APIRouter()
 
-# Configure logging for this module
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__) # Initialize logger
 
 @router.get("/me", response_model=UserProfile, tags=["User"], summary="Get current user profile")
@@ -20,7 +18,7 @@ async def get_user_profile(current_user_id: str = Depends(get_current_user)):
     Requires a valid JWT token in the Authorization header.
     """
     logger.info(f"Fetching profile for user_id: {current_user_id}")
-    supabase = await get_supabase_backend_client()
+    supabase = get_supabase_backend_client()
     
     try:
         # Fetch profile data from public.users table
@@ -56,7 +54,7 @@ async def update_api_keys(
     Requires a valid JWT token.
     """
     logger.info(f"Attempting to update API keys for user_id: {current_user_id}")
-    supabase = await get_supabase_backend_client()
+    supabase = get_supabase_backend_client()
     
     try:
         key = api_keys.binance_api_key.get_secret_value()
@@ -1,5 +1,7 @@
 import asyncio
+import functools
 import logging
+import time
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
 import uuid
@@ -7,22 +9,35 @@ import uuid
 # Import the function to get the Binance client and Optional type hint
 from typing import Dict, Any, Optional
 import datetime # Needed for timestamp
-from ..utils.binance_client import get_binance_client, get_order_status # Added get_order_status
-from ..utils.db_client import record_trade, record_performance_snapshot # Import db functions
+from ..utils.binance_client import get_binance_client, get_order_status, REQUEST_LIMITER, ORDER_LIMITER # Added get_order_status
+from ..utils import binance_async
+from ..utils.db_client import record_trade, record_performance_snapshot, flush_db_buffers # Import db functions
 # Import Binance exceptions for specific error handling
 from binance.exceptions import BinanceAPIException, BinanceOrderException
 
-# Configure logging for the base bot
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Order side/type constants; callers should pass these so _place_order can skip normalization
+BUY = 'BUY'
+SELL = 'SELL'
+MARKET = 'MARKET'
+LIMIT = 'LIMIT'
+
 
 class BaseTradingBot(ABC):
     """
     Abstract Base Class for all trading bots.
     Defines common interface and shared functionality.
     """
+    # Fixed attribute layout: no per-instance __dict__, slot-offset attribute access. Subclasses declare their own slots.
+    __slots__ = (
+        'bot_id', 'user_id', '_user_uuid', 'bot_type', 'name', 'symbol', 'is_active', 'config_params',
+        'logger', '_run_task', '_stop_event', '_client', 'current_position_size',
+        'entry_price', 'realized_pnl', 'total_trades'
+    )
+
     def __init__(self, bot_config: Dict[str, Any], user_id: str):
         self.bot_id: uuid.UUID = bot_config.get('id', uuid.uuid4()) 
         self.user_id: str = user_id
+        self._user_uuid: uuid.UUID = uuid.UUID(user_id) # Parsed once for DB writes
         self.bot_type: str = bot_config.get('bot_type', 'base')
         self.name: str = bot_config.get('name', f"{self.bot_type}_bot_{self.bot_id}")
         self.symbol: str = bot_config.get('symbol', '').upper()
@@ -34,6 +49,8 @@ class BaseTradingBot(ABC):
         self.logger.setLevel(logging.DEBUG) 
         
         self._run_task: Optional[asyncio.Task] = None 
+        self._stop_event = asyncio.Event() # Set by stop() to wake sleeping run loops immediately
+        self._client = None # Binance client, resolved once via _get_client()
 
         # --- Bot State ---
         self.current_position_size: float = 0.0 
@@ -51,6 +68,20 @@ class BaseTradingBot(ABC):
     async def _run_logic(self):
         pass
 
+    async def _wait_for_stop(self, timeout: float) -> bool:
+        """Sleeps for up to `timeout` seconds, returning True early if stop() is called."""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._stop_event.is_set()
+
+    async def _get_client(self):
+        """Returns the shared Binance client, caching it on the bot after the first lookup."""
+        if self._client is None:
+            self._client = await get_binance_client()
+        return self._client
+
     async def start(self):
         if not self.is_active:
             self.logger.warning(f"Bot '{self.name}' is not active. Cannot start.")
@@ -58,11 +89,12 @@ class BaseTradingBot(ABC):
         if self._run_task and not self._run_task.done():
             self.logger.warning(f"Bot '{self.name}' is already running.")
             return
-        client = await get_binance_client()
+        client = await self._get_client()
         if not client:
              self.logger.error(f"Cannot start bot '{self.name}': Binance client could not be initialized.")
              return
         self.logger.info(f"Attempting to start bot task for '{self.name}'...")
+        self._stop_event.clear()
         try:
              self._run_task = asyncio.create_task(self._run_logic_wrapper()) 
              self.logger.info(f"Bot '{self.name}' task created and background execution started.")
@@ -85,6 +117,7 @@ class BaseTradingBot(ABC):
     async def stop(self):
         self.logger.info(f"Attempting to stop bot '{self.name}'...")
         self.is_active = False 
+        self._stop_event.set()
         if self._run_task and not self._run_task.done():
             try:
                 await asyncio.wait_for(self._run_task, timeout=15.0) 
@@ -99,6 +132,7 @@ class BaseTradingBot(ABC):
         else:
             self.logger.info(f"Bot '{self.name}' was not running or task already completed.")
         self._run_task = None 
+        await flush_db_buffers() # Buffered rows are visible to a restarted bot (e.g. DCA's last purchase time)
 
     def update_config(self, new_config_params: Dict[str, Any]):
         self.logger.info(f"Updating configuration for bot '{self.name}'...")
@@ -118,17 +152,16 @@ class BaseTradingBot(ABC):
     
     async def _place_order(self, side: str, order_type: str, quantity: float, price: Optional[float] = None) -> Optional[Dict]:
         """Places an order via Binance client and records it."""
-        client = await get_binance_client()
+        client = await self._get_client()
         if not client:
             self.logger.error("Cannot place order: Binance client not available.")
             return None
             
-        side_upper = side.upper()
-        type_upper = order_type.upper()
+        side_upper = side if side is BUY or side is SELL else side.upper()
+        type_upper = order_type if order_type is MARKET or order_type is LIMIT else order_type.upper()
         log_price = f" @ {price}" if price else " @ Market"
         self.logger.info(f"Attempting to place {side_upper} {type_upper} order for {quantity:.8f} {self.symbol}{log_price}")
         
-        loop = asyncio.get_event_loop()
         order_params = {} 
         try:
             # Prepare parameters carefully
@@ -138,7 +171,7 @@ class BaseTradingBot(ABC):
                 'type': type_upper # Ensure type is uppercase
             }
             
-            if type_upper == 'MARKET' and side_upper == 'BUY':
+            if type_upper == MARKET and side_upper == BUY:
                  quote_qty = getattr(self, 'purchase_amount_quote', 0) 
                  if quote_qty > 0:
                      order_params['quoteOrderQty'] = quote_qty
@@ -151,17 +184,18 @@ class BaseTradingBot(ABC):
                  order_params['quantity'] = quantity
             else:
                  # Allow quantity=0 for DCA quoteOrderQty case, raise otherwise
-                 if not (type_upper == 'MARKET' and side_upper == 'BUY' and getattr(self, 'purchase_amount_quote', 0) > 0):
+                 if not (type_upper == MARKET and side_upper == BUY and getattr(self, 'purchase_amount_quote', 0) > 0):
                       raise ValueError("Order requires positive 'quantity'.")
 
-            if type_upper == 'LIMIT':
+            if type_upper == LIMIT:
                 if price is None or price <= 0: raise ValueError("Price must be positive for LIMIT orders.")
                 # TODO: Fetch symbol precision rules from exchange info for price/qty formatting
-                order_params['price'] = str(price) 
+                order_params['price'] = f"{price:.8f}" 
                 order_params['timeInForce'] = 'GTC' 
             
-            self.logger.debug(f"Executing client.create_order with params: {order_params}")
-            order = await loop.run_in_executor(None, client.create_order, **order_params)
+            self.logger.debug(f"Executing create_order with params: {order_params}")
+            async with ORDER_LIMITER, REQUEST_LIMITER:
+                order = await binance_async.create_order(**order_params)
             self.logger.info(f"Binance API response for create_order: {order}") 
             
             # --- Update Bot State & Record Trade ---
@@ -169,15 +203,17 @@ class BaseTradingBot(ABC):
                 executed_qty = float(order.get('executedQty', 0))
                 
                 if executed_qty > 0:
+                    # Parse once and reuse for both state update and DB record
+                    trade_details = self._parse_order_to_trade_details(order, side_upper, type_upper)
                     self.total_trades += 1
                     # Simplistic state update - needs refinement for avg price etc.
-                    avg_fill_price = self._parse_order_to_trade_details(order, side_upper, type_upper)['price'] or 0
-                    if side_upper == 'BUY':
+                    avg_fill_price = trade_details['price'] or 0
+                    if side_upper == BUY:
                         # TODO: Update average entry price correctly
                         new_total_cost = (self.entry_price * self.current_position_size if self.entry_price else 0) + (avg_fill_price * executed_qty)
                         self.current_position_size += executed_qty
                         self.entry_price = new_total_cost / self.current_position_size if self.current_position_size > 0 else None
-                    elif side_upper == 'SELL':
+                    elif side_upper == SELL:
                          # TODO: Calculate realized PnL correctly
                          if self.entry_price:
                               self.realized_pnl += (avg_fill_price - self.entry_price) * executed_qty
@@ -186,13 +222,10 @@ class BaseTradingBot(ABC):
                               self.current_position_size = 0.0
                               self.entry_price = None 
 
-                # Record in DB
-                trade_details = self._parse_order_to_trade_details(order, side_upper, type_upper)
-                if trade_details["quantity"] > 0:
-                    # Use run_in_executor if record_trade becomes complex/blocking
+                    # Only queues the row (written in batches off the order path), so callers act on the fill immediately
                     await record_trade(
                         bot_config_id=self.bot_id,
-                        user_id=uuid.UUID(self.user_id), 
+                        user_id=self._user_uuid,
                         trade_data=trade_details
                     )
                 else:
@@ -214,7 +247,9 @@ class BaseTradingBot(ABC):
 
     def _parse_order_to_trade_details(self, order: Dict, side: str, order_type: str) -> Dict:
         """Helper to extract trade details from a Binance order response."""
-        timestamp_ms = order.get('transactTime', datetime.datetime.now(datetime.timezone.utc).timestamp() * 1000)
+        timestamp_ms = order.get('transactTime')
+        if timestamp_ms is None:
+            timestamp_ms = time.time_ns() // 1_000_000
         timestamp_iso = datetime.datetime.fromtimestamp(timestamp_ms / 1000, tz=datetime.timezone.utc).isoformat()
         executed_qty = float(order.get('executedQty', 0))
         order_price_str = order.get('price', '0') 
@@ -245,11 +280,12 @@ class BaseTradingBot(ABC):
         }
 
     async def _get_account_balance(self, asset: str) -> Optional[Dict]:
-        client = await get_binance_client()
+        client = await self._get_client()
         if not client: self.logger.error("Cannot get balance: Binance client not available."); return None
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         try:
-            balance_data = await loop.run_in_executor(None, lambda: client.get_asset_balance(asset=asset))
+            async with REQUEST_LIMITER:
+                balance_data = await loop.run_in_executor(None, functools.partial(client.get_asset_balance, asset=asset))
             if balance_data:
                  self.logger.debug(f"Fetched balance for {asset}: {balance_data}")
                  return {
@@ -289,7 +325,7 @@ class BaseTradingBot(ABC):
                 "metrics": { "unrealized_pnl": unrealized_pnl, "realized_pnl": self.realized_pnl }
             }
             await record_performance_snapshot(
-                bot_config_id=self.bot_id, user_id=uuid.UUID(self.user_id),
+                bot_config_id=self.bot_id, user_id=self._user_uuid,
                 performance_data=performance_data
             )
         except Exception as e:
@@ -3,7 +3,8 @@ import logging
 from typing import Dict, Any, Optional # Import Optional
 import datetime
 
-from .base_bot import BaseTradingBot
+from .base_bot import BaseTradingBot, BUY, MARKET
+from ..utils.db_client import get_latest_trade
 # Import necessary client functions if needed (e.g., placing orders)
 
 class DCATradingBot(BaseTradingBot):
@@ -11,6 +12,11 @@ class DCATradingBot(BaseTradingBot):
     Implements a Dollar-Cost Averaging (DCA) trading strategy.
     Periodically buys a fixed amount of quote currency worth of the base asset.
     """
+    # Attributes beyond BaseTradingBot's slots
+    __slots__ = (
+        'purchase_amount_quote', 'purchase_interval_seconds', 'last_purchase_time'
+    )
+
     def __init__(self, bot_config: Dict[str, Any], user_id: str):
         super().__init__(bot_config, user_id)
         self.bot_type = "dca" # Explicitly set bot type
@@ -31,9 +37,27 @@ class DCATradingBot(BaseTradingBot):
 
         self.logger.info(f"DCA Bot '{self.name}' initialized: Amount({self.purchase_amount_quote} quote), Interval({self.purchase_interval_seconds}s)")
 
+    async def _restore_last_purchase_time(self):
+        """Restores last_purchase_time from the latest recorded BUY so a restart doesn't re-buy immediately."""
+        last_trade = await get_latest_trade(self.bot_id, side=BUY)
+        if not last_trade or not last_trade.get('timestamp'):
+            self.logger.info(f"No previous DCA purchase found for {self.name}.")
+            return
+        try:
+            last_time = datetime.datetime.fromisoformat(str(last_trade['timestamp']))
+            if last_time.tzinfo is None:
+                last_time = last_time.replace(tzinfo=datetime.timezone.utc)
+            self.last_purchase_time = last_time
+            self.logger.info(f"Restored last DCA purchase time for {self.name}: {self.last_purchase_time.isoformat()}")
+        except ValueError as e:
+            self.logger.warning(f"Could not parse last purchase timestamp '{last_trade.get('timestamp')}': {e}")
+
     async def _run_logic(self):
         """Core logic loop for the DCA bot."""
         self.logger.info(f"Starting DCA logic loop for {self.symbol}...")
+
+        if self.last_purchase_time is None:
+            await self._restore_last_purchase_time()
         
         while self.is_active:
             try:
@@ -61,8 +85,8 @@ class DCATradingBot(BaseTradingBot):
                     # Use the base class method which handles DB recording
                     # Pass quantity=0 because we are using quoteOrderQty
                     order_result = await self._place_order(
-                        side='BUY', 
-                        order_type='MARKET', 
+                        side=BUY, 
+                        order_type=MARKET, 
                         quantity=0 
                     )
                             
@@ -74,16 +98,9 @@ class DCATradingBot(BaseTradingBot):
                         # Don't update last_purchase_time if order failed
                         time_to_wait = 60 # Wait 1 minute before checking again after failure
 
-                # Wait until the next purchase time, checking for stop signal periodically
+                # Wait until the next purchase time, waking immediately on stop
                 self.logger.debug(f"DCA check complete for {self.name}. Waiting for {time_to_wait:.0f} seconds...")
-                sleep_interval = 5 # Check every 5 seconds
-                remaining_sleep = time_to_wait
-                while remaining_sleep > 0 and self.is_active:
-                     await asyncio.sleep(min(sleep_interval, remaining_sleep))
-                     remaining_sleep -= sleep_interval
-                
-                # If loop exited because is_active became false, break outer loop
-                if not self.is_active: break
+                if await self._wait_for_stop(time_to_wait): break
 
             except asyncio.CancelledError:
                 self.logger.info(f"DCA logic loop for {self.symbol} cancelled.")
@@ -1,12 +1,34 @@
 import asyncio
+import bisect
 import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+import random
+from itertools import islice
+import numpy as np
+import orjson
+from sortedcontainers import SortedDict
 from typing import Dict, Any, List, Tuple, Optional
-import uuid
-import datetime # For recording trade timestamp
 
-from .base_bot import BaseTradingBot
+from .base_bot import BaseTradingBot, BUY, SELL, LIMIT
 from ..utils.grid import calculate_grid_levels, calculate_order_quantities
-from ..utils.binance_client import get_current_price, get_order_status, place_order # Import necessary functions
+from ..utils.binance_client import get_current_price, get_order_status, get_open_orders, cancel_all_open_orders, start_user_data_stream, REQUEST_LIMITER # Import necessary functions
+from ..utils import binance_async
+from ..utils.order_status_batcher import open_orders_batcher
+from binance.exceptions import BinanceAPIException
+
+# Absolute tolerance when matching an order price back to its grid level
+GRID_LEVEL_TOLERANCE = 1e-8
+# Where each bot's grid state file lives; defaults to backend/.state (git-ignored), not the server's CWD
+GRID_STATE_DIR = Path(os.getenv("GRID_STATE_DIR", Path(__file__).resolve().parent.parent / ".state"))
+
+@dataclass(slots=True)
+class ActiveOrder:
+    """A grid order being tracked on the exchange."""
+    price: float
+    quantity: float
+    side: str
 
 class GridTradingBot(BaseTradingBot):
     """
@@ -15,6 +37,14 @@ class GridTradingBot(BaseTradingBot):
     When a buy fills, it places a sell order one grid level above.
     When a sell fills, it places a buy order one grid level below.
     """
+    # Attributes beyond BaseTradingBot's slots
+    __slots__ = (
+        'lower_bound', 'upper_bound', 'num_grids', 'grid_mode', 'investment_amount', 'grid_levels',
+        'active_orders', '_active_by_price', '_processing_orders', '_status_sem', '_orders_lock',
+        '_fill_events', '_user_stream', '_min_poll', '_max_poll', '_poll_interval',
+        '_state_path', '_state_dirty', '_persist_lock', '_level_index', '_level_values'
+    )
+
     def __init__(self, bot_config: Dict[str, Any], user_id: str):
         super().__init__(bot_config, user_id)
         self.bot_type = "grid" # Explicitly set bot type
@@ -29,11 +59,31 @@ class GridTradingBot(BaseTradingBot):
         # TODO: Add base_asset_amount parameter for initial sell grid setup
 
         # --- State Variables ---
-        self.grid_levels: List[float] = []
-        # Store active order details {orderId: {price, quantity, side}}
-        self.active_orders: Dict[str, Dict[str, Any]] = {} 
+        self.grid_levels: np.ndarray = np.empty(0, dtype=np.float64) # Sorted, fixed after setup
+        # {level: index into grid_levels}; tracked order prices are the level floats themselves, so lookups hit exactly
+        self._level_index: Dict[float, int] = {}
+        self._level_values: Tuple[float, ...] = () # grid_levels as Python floats, for bisect
+        # Store active order details {orderId: ActiveOrder}
+        self.active_orders: Dict[str, ActiveOrder] = {} 
+        # Same orders indexed by price {price: {orderId, ...}} for O(log N) neighbor/range queries
+        self._active_by_price: SortedDict = SortedDict()
         # Store order IDs currently being processed to avoid race conditions
         self._processing_orders: set[str] = set() 
+        # Bounds concurrent order status requests; lock guards active_orders while handlers interleave
+        self._status_sem = asyncio.Semaphore(8)
+        self._orders_lock = asyncio.Lock()
+        # Order IDs reported closed by the user data stream, awaiting handling on the event loop
+        self._fill_events: asyncio.Queue = asyncio.Queue()
+        self._user_stream = None
+        # Adaptive REST polling: back off while nothing changes, reset to the floor on any transition
+        self._min_poll: float = float(self.config_params.get('min_poll', 5))
+        self._max_poll: float = float(self.config_params.get('max_poll', 300))
+        self._poll_interval: float = self._min_poll
+        # Grid levels and tracked orders are mirrored to disk so a restart can resume instead of rebuilding.
+        # Changes only mark the state dirty; _persist() writes it once per setup or fill-handling pass.
+        self._state_path = GRID_STATE_DIR / f"{self.bot_id}.json"
+        self._state_dirty = False
+        self._persist_lock = asyncio.Lock() # Keeps writes in order so an older snapshot never lands last
 
         if self.lower_bound <= 0 or self.upper_bound <= 0 or self.lower_bound >= self.upper_bound:
             raise ValueError("Invalid grid bounds provided.")
@@ -47,28 +97,134 @@ class GridTradingBot(BaseTradingBot):
 
     def _find_next_grid_level(self, current_level: float, direction: str) -> Optional[float]:
         """Finds the next grid level above ('up') or below ('down') the current level."""
+        levels = self.grid_levels
+        idx = self._level_index.get(current_level)
+        if idx is None:
+            idx = self._nearest_level_index(current_level)
+            if idx is None:
+                self.logger.warning(f"Level {current_level} not found in calculated grid levels: {levels}")
+                return None
+
+        if direction == 'up' and idx < len(levels) - 1:
+            return float(levels[idx + 1])
+        elif direction == 'down' and idx > 0:
+            return float(levels[idx - 1])
+        return None # No next level in that direction
+
+    def _nearest_level_index(self, price: float) -> Optional[int]:
+        """Index of the grid level within GRID_LEVEL_TOLERANCE of `price`, so float drift doesn't lose the level."""
+        levels = self._level_values
+        idx = bisect.bisect_left(levels, price)
+        if idx < len(levels) and abs(levels[idx] - price) <= GRID_LEVEL_TOLERANCE:
+            return idx
+        if idx > 0 and abs(levels[idx - 1] - price) <= GRID_LEVEL_TOLERANCE:
+            return idx - 1
+        return None
+
+    def _set_grid_levels(self, levels):
+        """Stores the (sorted) grid levels as a read-only array and rebuilds the level -> index map."""
+        self.grid_levels = np.asarray(levels, dtype=np.float64)
+        self.grid_levels.flags.writeable = False
+        self._level_values = tuple(self.grid_levels.tolist())
+        self._level_index = {level: i for i, level in enumerate(self._level_values)}
+
+    def _track_order(self, order_id: str, order: ActiveOrder):
+        """Adds an order to both the by-ID and by-price indexes."""
+        self.active_orders[order_id] = order
+        self._active_by_price.setdefault(order.price, set()).add(order_id)
+        self._state_dirty = True
+
+    def _untrack_order(self, order_id: str) -> Optional[ActiveOrder]:
+        """Removes an order from both indexes, returning it if it was tracked."""
+        order = self.active_orders.pop(order_id, None)
+        if order is not None:
+            ids_at_price = self._active_by_price.get(order.price)
+            if ids_at_price is not None:
+                ids_at_price.discard(order_id)
+                if not ids_at_price:
+                    del self._active_by_price[order.price]
+            self._state_dirty = True
+        return order
+
+    def _clear_tracked_orders(self):
+        self.active_orders = {}
+        self._active_by_price = SortedDict()
+        self._state_dirty = True
+
+    def _grid_params(self) -> List[Any]:
+        return [self.lower_bound, self.upper_bound, self.num_grids, self.grid_mode]
+
+    async def _persist(self):
+        """
+        Writes grid levels and tracked orders to the state file if they changed since the last write.
+        The snapshot is taken on the event loop; the file write (temp file, then atomic rename) runs in the executor.
+        """
+        if not self._state_dirty:
+            return
+        self._state_dirty = False
+        state = orjson.dumps({
+            'params': self._grid_params(),
+            'grid_levels': self.grid_levels,
+            'active_orders': self.active_orders,
+        }, option=orjson.OPT_SERIALIZE_NUMPY)
+        loop = asyncio.get_running_loop()
         try:
-            current_index = self.grid_levels.index(current_level)
-            if direction == 'up' and current_index < len(self.grid_levels) - 1:
-                return self.grid_levels[current_index + 1]
-            elif direction == 'down' and current_index > 0:
-                return self.grid_levels[current_index - 1]
-            else:
-                return None # No next level in that direction
-        except ValueError:
-            self.logger.warning(f"Level {current_level} not found in calculated grid levels: {self.grid_levels}")
-            return None
-        except IndexError:
-             self.logger.warning(f"Index out of bounds while finding next grid level for {current_level}.")
-             return None
+            async with self._persist_lock:
+                await loop.run_in_executor(None, self._write_state, state)
+        except OSError as e:
+            self._state_dirty = True # Retry on the next pass
+            self.logger.error(f"Failed to persist grid state to {self._state_path}: {e}")
+
+    def _write_state(self, state: bytes):
+        self._state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._state_path.with_suffix('.tmp')
+        tmp_path.write_bytes(state)
+        os.replace(tmp_path, self._state_path)
+
+    def _restore_state(self) -> bool:
+        """
+        Loads grid levels and tracked orders persisted by a previous run of this bot.
+        Returns False if there is no usable state (missing, unreadable, empty, or for different grid parameters).
+        """
+        try:
+            state = orjson.loads(self._state_path.read_bytes())
+        except FileNotFoundError:
+            return False
+        except (OSError, orjson.JSONDecodeError) as e:
+            self.logger.warning(f"Could not read grid state from {self._state_path}: {e}")
+            return False
+
+        if state.get('params') != self._grid_params() or not state.get('active_orders'):
+            self.logger.info("Persisted grid state is empty or was saved for different grid parameters. Ignoring it.")
+            return False
+
+        self._set_grid_levels(state['grid_levels'])
+        self.active_orders = {}
+        self._active_by_price = SortedDict()
+        for order_id, order in state['active_orders'].items():
+            self.active_orders[order_id] = ActiveOrder(**order)
+            self._active_by_price.setdefault(order['price'], set()).add(order_id)
+        return True
+
+    def _orders_near(self, price: float, per_side: int = 2) -> List[str]:
+        """Returns the IDs of the tracked orders at the `per_side` closest prices below and above `price`."""
+        below = islice(self._active_by_price.irange(maximum=price, reverse=True), per_side)
+        above = islice(self._active_by_price.irange(minimum=price, inclusive=(False, True)), per_side)
+        return [oid for level in (*below, *above) for oid in self._active_by_price[level]]
 
     async def _setup_initial_grid(self):
         """Calculates grid levels and places initial buy/sell limit orders."""
         self.logger.info(f"Setting up initial grid for {self.symbol}...")
+
+        # Resume from persisted state; the first fill check diffs it against the exchange's open orders
+        # and places counter-orders for anything that filled while the bot was down
+        if self._restore_state():
+            self.logger.info(f"Restored {len(self.active_orders)} tracked orders and {self.grid_levels.size} grid levels from {self._state_path}.")
+            return True
         
         # Cancel any potentially lingering orders from previous runs (important for restarts)
         await self._cancel_all_active_orders(fetch_open_orders=True) 
-        self.active_orders = {} # Reset tracked orders
+        self._clear_tracked_orders() # Reset tracked orders
 
         current_price = await get_current_price(self.symbol)
         if current_price is None:
@@ -76,14 +232,14 @@ class GridTradingBot(BaseTradingBot):
             return False 
 
         try:
-            self.grid_levels = calculate_grid_levels(
-                self.lower_bound, self.upper_bound, self.num_grids, self.grid_mode
-            )
-            if not self.grid_levels: raise ValueError("Grid level calculation failed.")
+            self._set_grid_levels(calculate_grid_levels(
+                self.lower_bound, self.upper_bound, self.num_grids, self.grid_mode, as_array=True
+            ))
+            if self.grid_levels.size == 0: raise ValueError("Grid level calculation failed.")
             
             # Calculate initial buy orders (levels below current price)
             buy_orders_to_place = calculate_order_quantities(
-                self.investment_amount, self.grid_levels, current_price, 'equal_value'
+                self.investment_amount, self._level_values, current_price, 'equal_value'
             )
             
             # TODO: Calculate initial sell orders (levels above current price) based on base_asset_amount
@@ -92,21 +248,9 @@ class GridTradingBot(BaseTradingBot):
             self.logger.info(f"Calculated {len(buy_orders_to_place)} buy orders and {len(sell_orders_to_place)} sell orders to place.")
 
             # --- Place Orders ---
-            orders_placed_count = 0
-            # Place buy orders
-            for level, quantity in buy_orders_to_place:
-                # TODO: Add rounding based on symbol's precision rules
-                self.logger.info(f"Placing BUY LIMIT order: {quantity:.8f} {self.symbol} @ {level:.4f}")
-                # Use the base class method which now handles DB recording
-                order_result = await self._place_order(side='BUY', order_type='LIMIT', quantity=quantity, price=level)
-                if order_result and order_result.get('orderId'):
-                    order_id = str(order_result['orderId'])
-                    self.active_orders[order_id] = {'price': level, 'quantity': quantity, 'side': 'BUY'}
-                    self.logger.info(f"BUY order placed successfully: ID {order_id}")
-                    orders_placed_count += 1
-                else:
-                     self.logger.error(f"Failed to place BUY order at level {level}.")
-                await asyncio.sleep(0.2) # Avoid hitting rate limits
+            # Place buy orders concurrently; _place_order waits on the shared order/weight rate limiters
+            results = await asyncio.gather(*[self._place_one(level, quantity) for level, quantity in buy_orders_to_place])
+            orders_placed_count = sum(1 for placed in results if placed)
 
             # TODO: Place sell orders similarly
 
@@ -120,123 +264,230 @@ class GridTradingBot(BaseTradingBot):
             self.logger.error(f"Unexpected error during grid setup: {e}", exc_info=True)
             return False
 
-    async def _check_and_handle_fills(self):
-        """Checks status of active orders and places counter-orders for filled ones."""
-        if not self.active_orders:
-            return # Nothing to check
+    async def _place_one(self, level: float, quantity: float) -> bool:
+        """Places a single initial BUY LIMIT grid order and tracks it. Returns True on success."""
+        # TODO: Add rounding based on symbol's precision rules
+        self.logger.info(f"Placing BUY LIMIT order: {quantity:.8f} {self.symbol} @ {level:.4f}")
+        # Use the base class method which now handles DB recording
+        order_result = await self._place_order(side=BUY, order_type=LIMIT, quantity=quantity, price=level)
+        if order_result and order_result.get('orderId'):
+            order_id = str(order_result['orderId'])
+            async with self._orders_lock:
+                self._track_order(order_id, ActiveOrder(price=level, quantity=quantity, side=BUY))
+            self.logger.info(f"BUY order placed successfully: ID {order_id}")
+            return True
+        self.logger.error(f"Failed to place BUY order at level {level}.")
+        return False
+
+    async def _place_counter(self, order_info: ActiveOrder, filled_quantity: float):
+        """Places the counter-order one grid level away from a filled order: SELL above a BUY, BUY below a SELL."""
+        filled_level = order_info.price
+        if order_info.side == BUY:
+            direction, counter_side = 'up', SELL
+        else:
+            direction, counter_side = 'down', BUY
+
+        counter_level = self._find_next_grid_level(filled_level, direction)
+        if not counter_level:
+            self.logger.warning(f"{order_info.side} filled at {filled_level}, but no grid level {direction} to place a {counter_side} order.")
+            return
+
+        self.logger.info(f"Placing counter {counter_side} order for {filled_quantity:.8f} @ {counter_level:.4f}")
+        counter_order = await self._place_order(side=counter_side, order_type=LIMIT, quantity=filled_quantity, price=counter_level)
+        if counter_order and counter_order.get('orderId'):
+            new_order_id = str(counter_order['orderId'])
+            async with self._orders_lock:
+                self._track_order(new_order_id, ActiveOrder(price=counter_level, quantity=filled_quantity, side=counter_side))
+            self.logger.info(f"Counter {counter_side} order placed: ID {new_order_id}")
+        else:
+            self.logger.error(f"Failed to place counter {counter_side} order at {counter_level}")
+            # TODO: Handle failure - retry? Alert?
 
-        # Create a copy of order IDs to check, as dict might change during iteration
-        order_ids_to_check = list(self.active_orders.keys())
+    async def _check_and_handle_fills(self) -> Tuple[int, int]:
+        """
+        Checks status of active orders and places counter-orders for filled ones.
+        Returns (num_fills, num_transitions), where transitions count every order that left the open state.
+        """
+        if not self.active_orders:
+            return 0, 0 # Nothing to check
+
+        # One (cross-bot batched) request for every open order on the symbol; anything still open needs no further check.
+        # Always diffed against every tracked order: this pass reconciles fills the user data stream missed,
+        # including ones from price excursions that happened entirely between two polls.
+        open_orders = await open_orders_batcher.get_open_orders(self.symbol)
+        if open_orders is None:
+            # Fall back to checking only the orders straddling the market, the ones most likely to have filled
+            current_price = await get_current_price(self.symbol)
+            if current_price is None:
+                self.logger.warning("Could not fetch open orders or current price. Will retry later.")
+                return 0, 0
+            order_ids_to_check = self._orders_near(current_price)
+            self.logger.warning(f"Could not fetch open orders. Checking {len(order_ids_to_check)} orders nearest {current_price} individually.")
+        else:
+            open_order_ids = {str(o['orderId']) for o in open_orders}
+            # Tracked orders missing from the open set were filled or closed; confirm each individually
+            order_ids_to_check = [oid for oid in self.active_orders if oid not in open_order_ids]
+            if len(order_ids_to_check) > 1:
+                # Confirm the orders nearest the market first; their counter-orders are the most time-sensitive
+                current_price = await get_current_price(self.symbol)
+                if current_price is not None:
+                    order_ids_to_check.sort(key=lambda oid: abs(self.active_orders[oid].price - current_price))
+        if not order_ids_to_check:
+            self.logger.debug(f"All {len(self.active_orders)} tracked orders still open.")
+            return 0, 0
         
-        for order_id in order_ids_to_check:
-             # Skip if already processing or removed
-            if order_id in self._processing_orders or order_id not in self.active_orders:
-                continue
+        # Confirm statuses concurrently, bounded by the status semaphore
+        results = await asyncio.gather(*[self._handle_order_status(oid) for oid in order_ids_to_check], return_exceptions=True)
+        num_fills = sum(1 for r in results if r == 'FILLED')
+        num_transitions = sum(1 for r in results if isinstance(r, str))
+        return num_fills, num_transitions
 
-            try:
-                self._processing_orders.add(order_id) # Mark as processing
-                
-                order_info = self.active_orders.get(order_id)
-                if not order_info: continue # Should not happen if check above works
+    async def _handle_order_status(self, order_id: str) -> Optional[str]:
+        """
+        Fetches the status of a single tracked order and places a counter-order if it filled.
+        Returns the closed status ('FILLED', 'CANCELED', ...) if the order left the book, else None.
+        """
+        # Skip if already processing or removed
+        if order_id in self._processing_orders or order_id not in self.active_orders:
+            return None
 
-                self.logger.debug(f"Checking status for order {order_id} ({order_info['side']} @ {order_info['price']})")
+        try:
+            self._processing_orders.add(order_id) # Mark as processing
+            
+            order_info = self.active_orders.get(order_id)
+            if not order_info: return None # Should not happen if check above works
+
+            self.logger.debug(f"Checking status for order {order_id} ({order_info.side} @ {order_info.price})")
+            async with self._status_sem:
                 status_result = await get_order_status(self.symbol, order_id)
 
-                if status_result and status_result.get('status') == 'FILLED':
-                    self.logger.info(f"Order {order_id} ({order_info['side']} @ {order_info['price']}) FILLED!")
-                    
-                    filled_price = float(status_result.get('price', order_info['price'])) # Use actual fill price if available
-                    filled_quantity = float(status_result.get('executedQty', order_info['quantity']))
-                    
-                    # Remove filled order from tracking
-                    del self.active_orders[order_id] 
-                    
-                    # Place counter order
-                    if order_info['side'] == 'BUY':
-                        sell_level = self._find_next_grid_level(order_info['price'], 'up')
-                        if sell_level:
-                            self.logger.info(f"Placing counter SELL order for {filled_quantity:.8f} @ {sell_level:.4f}")
-                            counter_order = await self._place_order(side='SELL', order_type='LIMIT', quantity=filled_quantity, price=sell_level)
-                            if counter_order and counter_order.get('orderId'):
-                                 new_order_id = str(counter_order['orderId'])
-                                 self.active_orders[new_order_id] = {'price': sell_level, 'quantity': filled_quantity, 'side': 'SELL'}
-                                 self.logger.info(f"Counter SELL order placed: ID {new_order_id}")
-                            else:
-                                 self.logger.error(f"Failed to place counter SELL order at {sell_level}")
-                                 # TODO: Handle failure - retry? Alert?
-                        else:
-                             self.logger.warning(f"Buy filled at {order_info['price']}, but no higher grid level found to place sell order.")
-                             
-                    elif order_info['side'] == 'SELL':
-                         buy_level = self._find_next_grid_level(order_info['price'], 'down')
-                         if buy_level:
-                             self.logger.info(f"Placing counter BUY order for {filled_quantity:.8f} @ {buy_level:.4f}")
-                             counter_order = await self._place_order(side='BUY', order_type='LIMIT', quantity=filled_quantity, price=buy_level)
-                             if counter_order and counter_order.get('orderId'):
-                                 new_order_id = str(counter_order['orderId'])
-                                 self.active_orders[new_order_id] = {'price': buy_level, 'quantity': filled_quantity, 'side': 'BUY'}
-                                 self.logger.info(f"Counter BUY order placed: ID {new_order_id}")
-                             else:
-                                 self.logger.error(f"Failed to place counter BUY order at {buy_level}")
-                                 # TODO: Handle failure
-                         else:
-                              self.logger.warning(f"Sell filled at {order_info['price']}, but no lower grid level found to place buy order.")
-
-                elif status_result and status_result.get('status') in ['CANCELED', 'EXPIRED', 'REJECTED']:
-                     self.logger.warning(f"Order {order_id} ({order_info['side']} @ {order_info['price']}) has status {status_result.get('status')}. Removing from active list.")
-                     del self.active_orders[order_id]
-                     # TODO: Potentially try to replace the order? Depends on strategy.
+            status = status_result.get('status') if status_result else None
+            if status == 'FILLED':
+                self.logger.info(f"Order {order_id} ({order_info.side} @ {order_info.price}) FILLED!")
                 
-                elif not status_result:
-                     # Error fetching status (logged in get_order_status), maybe temporary issue
-                     self.logger.warning(f"Could not fetch status for order {order_id}. Will retry later.")
-                     
-                # else: Order is NEW, PARTIALLY_FILLED, PENDING_CANCEL - keep tracking
-
-            except Exception as e:
-                 self.logger.error(f"Error processing order {order_id}: {e}", exc_info=True)
-            finally:
-                 self._processing_orders.discard(order_id) # Ensure removal from processing set
+                filled_quantity = float(status_result.get('executedQty', order_info.quantity))
+                
+                # Remove filled order from tracking; if a concurrent handler or cancel got there first, it owns the order
+                async with self._orders_lock:
+                    if self._untrack_order(order_id) is None:
+                        return None
+                
+                await self._place_counter(order_info, filled_quantity)
+                return 'FILLED'
+
+            elif status in ('CANCELED', 'EXPIRED', 'REJECTED'):
+                 self.logger.warning(f"Order {order_id} ({order_info.side} @ {order_info.price}) has status {status}. Removing from active list.")
+                 async with self._orders_lock:
+                     if self._untrack_order(order_id) is None:
+                         return None
+                 # TODO: Potentially try to replace the order? Depends on strategy.
+                 return status
+            
+            elif not status_result:
+                 # Error fetching status (logged in get_order_status), maybe temporary issue
+                 self.logger.warning(f"Could not fetch status for order {order_id}. Will retry later.")
+                 
+            # else: Order is NEW, PARTIALLY_FILLED, PENDING_CANCEL - keep tracking
 
-            await asyncio.sleep(0.1) # Small delay between checking orders
+        except Exception as e:
+             self.logger.error(f"Error processing order {order_id}: {e}", exc_info=True)
+        finally:
+             self._processing_orders.discard(order_id) # Ensure removal from processing set
+        return None
+
+
+    def _start_fill_stream(self):
+        """Subscribes to the user data stream and forwards closed-order events for this symbol to the fill queue."""
+        loop = asyncio.get_running_loop()
+
+        def on_user_event(msg: Dict[str, Any]):
+            # Runs on the websocket manager thread; hand off to the event loop
+            if msg.get('e') == 'executionReport' and msg.get('s') == self.symbol \
+                    and msg.get('X') in ('FILLED', 'CANCELED', 'EXPIRED', 'REJECTED'):
+                loop.call_soon_threadsafe(self._fill_events.put_nowait, str(msg.get('i')))
+            elif msg.get('e') == 'error':
+                self.logger.error(f"User data stream error: {msg}")
+
+        self._user_stream = start_user_data_stream(on_user_event)
+        if self._user_stream:
+            self.logger.info(f"Listening for fills on the user data stream for {self.symbol}.")
+        else:
+            self.logger.warning("User data stream unavailable. Falling back to REST polling.")
 
+    def _stop_fill_stream(self):
+        if self._user_stream:
+            try:
+                self._user_stream.stop()
+            except Exception as e:
+                self.logger.error(f"Error stopping user data stream: {e}", exc_info=True)
+            self._user_stream = None
+
+    async def _wait_for_fill_events(self, timeout: float):
+        """Handles streamed fill events until `timeout` elapses or stop() is called."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not self._stop_event.is_set():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            get_task = asyncio.ensure_future(self._fill_events.get())
+            stop_task = asyncio.ensure_future(self._stop_event.wait())
+            done, pending = await asyncio.wait({get_task, stop_task}, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            if get_task in done:
+                order_id = get_task.result()
+                if order_id in self.active_orders:
+                    await self._handle_order_status(order_id)
+                    await self._persist()
 
     async def _run_logic(self):
         """Core logic loop for the grid bot."""
         self.logger.info(f"Starting grid logic loop for {self.symbol}...")
         
         setup_successful = await self._setup_initial_grid()
+        await self._persist()
         
         if not setup_successful:
             self.logger.error("Grid setup failed. Stopping bot.")
             self.is_active = False 
             return
 
+        self._start_fill_stream()
+
         while self.is_active:
             try:
-                await self._check_and_handle_fills()
+                num_fills, num_transitions = await self._check_and_handle_fills()
+                await self._persist()
+                
+                if self._user_stream:
+                    # With the stream running, REST polling is only a slow reconciliation safety net
+                    self._poll_interval = self._max_poll
+                elif num_fills or num_transitions:
+                    self._poll_interval = self._min_poll
+                else:
+                    self._poll_interval = min(self._poll_interval * 2, self._max_poll)
+                # Jitter keeps many bots from polling in lockstep
+                wait_time = self._poll_interval * random.uniform(0.8, 1.2)
                 
-                # Wait before the next check cycle, checking for stop signal periodically
-                sleep_duration = 30 # Check orders every 30 seconds (adjust as needed)
-                sleep_interval = 5  # Check stop flag every 5 seconds
-                remaining_sleep = sleep_duration
-                while remaining_sleep > 0 and self.is_active:
-                     await asyncio.sleep(min(sleep_interval, remaining_sleep))
-                     remaining_sleep -= sleep_interval
+                # React to streamed fills until the next reconciliation cycle
+                await self._wait_for_fill_events(wait_time)
                 
-                # If loop exited because is_active became false, break outer loop
-                if not self.is_active: break
+                # If the wait ended because stop() was called, break outer loop
+                if not self.is_active or self._stop_event.is_set(): break
 
             except asyncio.CancelledError:
                 self.logger.info(f"Grid logic loop for {self.symbol} cancelled.")
                 break
             except Exception as e:
                 self.logger.error(f"Error in grid logic loop for {self.symbol}: {e}", exc_info=True)
-                await asyncio.sleep(60) # Wait after error
+                await self._wait_for_stop(60) # Wait after error
 
         self.logger.info(f"Grid logic loop for {self.symbol} stopped.")
+        self._stop_fill_stream()
         await self._cancel_all_active_orders() # Cancel remaining orders on stop
-        self.active_orders = {} 
+        self._clear_tracked_orders()
+        await self._persist()
 
     async def _cancel_all_active_orders(self, fetch_open_orders=False):
         """
@@ -247,26 +498,28 @@ class GridTradingBot(BaseTradingBot):
                                       for this symbol and attempts to cancel them. 
                                       If False, only cancels orders tracked in self.active_orders.
         """
-        client = await get_binance_client()
+        client = await self._get_client()
         if not client:
             self.logger.error("Cannot cancel orders: Binance client not available.")
             return
 
         orders_to_cancel_ids = set() # Use a set to avoid duplicates
 
+        # Knowing the exchange's open set lets us cancel everything with one request
+        open_order_ids: Optional[set] = None
+        if fetch_open_orders or len(self.active_orders) > 1:
+            open_orders = await get_open_orders(self.symbol)
+            if open_orders is not None:
+                open_order_ids = {str(o['orderId']) for o in open_orders}
+
         if fetch_open_orders:
             self.logger.info(f"Fetching all open orders for {self.symbol} to cancel...")
-            loop = asyncio.get_event_loop()
-            try:
-                # Ensure get_open_orders is called correctly within executor
-                open_orders = await loop.run_in_executor(None, lambda: client.get_open_orders(symbol=self.symbol))
-                fetched_ids = {str(o['orderId']) for o in open_orders}
-                orders_to_cancel_ids.update(fetched_ids)
-                self.logger.info(f"Found {len(fetched_ids)} open orders on exchange.")
-            except Exception as e:
-                self.logger.error(f"Failed to fetch open orders for cancellation: {e}", exc_info=True)
+            if open_order_ids is not None:
+                orders_to_cancel_ids.update(open_order_ids)
+                self.logger.info(f"Found {len(open_order_ids)} open orders on exchange.")
+            else:
                 # Fallback to cancelling only locally tracked orders if fetch fails
-                self.logger.warning("Falling back to cancelling only locally tracked orders.")
+                self.logger.warning("Failed to fetch open orders. Falling back to cancelling only locally tracked orders.")
                 orders_to_cancel_ids.update(self.active_orders.keys())
         else:
             orders_to_cancel_ids.update(self.active_orders.keys())
@@ -276,38 +529,20 @@ class GridTradingBot(BaseTradingBot):
              self.logger.info("No orders found to cancel.")
              return
 
+        # Bulk cancel only when it cannot touch orders we were not asked to cancel
+        if open_order_ids is not None and open_order_ids <= orders_to_cancel_ids:
+            cancelled = await cancel_all_open_orders(self.symbol)
+            if cancelled is not None:
+                self.logger.info(f"Cancelled {len(cancelled)} open orders for bot {self.name} in a single request.")
+                async with self._orders_lock:
+                    self._clear_tracked_orders()
+                self._processing_orders = set()
+                return
+            self.logger.warning("Bulk cancellation failed. Falling back to cancelling orders individually.")
+
         self.logger.info(f"Attempting to cancel {len(orders_to_cancel_ids)} orders for bot {self.name}...")
-        loop = asyncio.get_event_loop()
-        cancelled_count = 0
-        
-        tasks = []
-        for order_id in orders_to_cancel_ids:
-             # Define async task for cancellation
-             async def cancel_task(oid):
-                 nonlocal cancelled_count
-                 try:
-                     self.logger.debug(f"Cancelling order {oid}...")
-                     # Use run_in_executor for the synchronous cancel_order call
-                     await loop.run_in_executor(None, lambda: client.cancel_order(symbol=self.symbol, orderId=oid))
-                     self.logger.info(f"Cancelled order {oid}.")
-                     cancelled_count += 1
-                     return oid, True # Return ID and success
-                 except BinanceAPIException as e_api:
-                     if e_api.code == -2011: # Order filled/cancelled/expired
-                         self.logger.warning(f"Order {oid} already closed or does not exist.")
-                         return oid, True # Consider it 'successfully' handled
-                     else:
-                         self.logger.error(f"API Error cancelling order {oid}: {e_api}")
-                         return oid, False # Return ID and failure
-                 except Exception as e_exc:
-                     self.logger.error(f"Unexpected error cancelling order {oid}: {e_exc}", exc_info=True)
-                     return oid, False # Return ID and failure
-                 finally:
-                      # Always remove from local tracking after attempt
-                      self.active_orders.pop(oid, None) 
-                      self._processing_orders.discard(oid)
-
-             tasks.append(cancel_task(order_id))
+        tracked_ids = set(self.active_orders)
+        tasks = [self._cancel_one(oid, oid in tracked_ids) for oid in orders_to_cancel_ids]
 
         # Run cancellation tasks concurrently
         results = await asyncio.gather(*tasks)
@@ -317,5 +552,36 @@ class GridTradingBot(BaseTradingBot):
 
         self.logger.info(f"Finished cancellation attempt. Successful: {successful_cancels}, Failed: {failed_cancels}.")
         # Clear local state again just in case
-        self.active_orders = {}
+        async with self._orders_lock:
+            self._clear_tracked_orders()
         self._processing_orders = set()
+
+    async def _cancel_one(self, oid: str, tracked: bool) -> Tuple[str, bool]:
+        """
+        Cancels a single order and stops tracking it. Returns (order ID, handled successfully).
+        `tracked` says whether the order was tracked when cancellation started; if it has since been
+        untracked, a fill handler already took it and no cancel request is sent.
+        """
+        async with self._orders_lock:
+            order = self._untrack_order(oid)
+        if tracked and order is None:
+            self.logger.debug(f"Order {oid} was already handled. Skipping cancellation.")
+            return oid, True
+        try:
+            self.logger.debug(f"Cancelling order {oid}...")
+            async with REQUEST_LIMITER:
+                await binance_async.cancel_order(symbol=self.symbol, orderId=oid)
+            self.logger.info(f"Cancelled order {oid}.")
+            return oid, True # Return ID and success
+        except BinanceAPIException as e_api:
+            if e_api.code == -2011: # Order filled/cancelled/expired
+                self.logger.warning(f"Order {oid} already closed or does not exist.")
+                return oid, True # Consider it 'successfully' handled
+            else:
+                self.logger.error(f"API Error cancelling order {oid}: {e_api}")
+                return oid, False # Return ID and failure
+        except Exception as e_exc:
+            self.logger.error(f"Unexpected error cancelling order {oid}: {e_exc}", exc_info=True)
+            return oid, False # Return ID and failure
+        finally:
+            self._processing_orders.discard(oid)
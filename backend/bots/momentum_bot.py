@@ -1,12 +1,25 @@
 import asyncio
 import logging
-import pandas as pd
-from typing import Dict, Any, Optional # Import Optional
-import datetime
+from typing import Dict, Any, Optional, Tuple # Import Optional
+import time
+import numpy as np
 
-from .base_bot import BaseTradingBot
-from ..utils.binance_client import get_historical_klines # Corrected import
-from ..utils.indicators import calculate_rsi, calculate_macd, calculate_sma # Import necessary indicators
+from .base_bot import BaseTradingBot, BUY, SELL, MARKET
+from ..utils.binance_client import get_historical_klines, MAX_KLINES_PER_REQUEST # Corrected import
+from ..utils.kline_cache import kline_cache
+from ..utils.indicators import calculate_momentum_state, calculate_momentum_signals
+
+# Binance kline intervals in seconds ('1M' approximated as 30 days)
+_INTERVAL_SECONDS = {
+    '1s': 1, '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+    '1h': 3600, '2h': 7200, '4h': 14400, '6h': 21600, '8h': 28800, '12h': 43200,
+    '1d': 86400, '3d': 259200, '1w': 604800, '1M': 2592000,
+}
+
+# Upper bound (seconds) on how long cached recent klines are reused across bots
+KLINE_CACHE_MAX_TTL = 60
+# Seconds after a candle closes before bots on that interval wake up to evaluate it
+CANDLE_CLOSE_DELAY = 2.0
 
 class MomentumTradingBot(BaseTradingBot):
     """
@@ -14,6 +27,16 @@ class MomentumTradingBot(BaseTradingBot):
     Example Strategy: Buy when RSI crosses above a threshold and MACD is bullish, 
                       Sell when RSI crosses below another threshold, MACD turns bearish, or stop-loss is hit.
     """
+    # Attributes beyond BaseTradingBot's slots
+    __slots__ = (
+        'rsi_period', 'rsi_oversold', 'rsi_overbought', 'macd_fast', 'macd_slow', 'macd_signal',
+        'candle_interval', 'interval_seconds', 'lookback_periods', 'trade_quantity', 'stop_loss_percent',
+        'in_position', 'current_entry_price', 'stop_loss_price', '_rsi_alpha', '_fast_alpha', '_slow_alpha',
+        '_signal_alpha', '_last_candle_open', '_last_close', '_avg_gain', '_avg_loss', '_ema_fast',
+        '_ema_slow', '_macd_signal', '_stop_loss_factor', '_required_candles', '_interval_ms', '_kline_ttl',
+        '_history_start_str'
+    )
+
     def __init__(self, bot_config: Dict[str, Any], user_id: str):
         super().__init__(bot_config, user_id)
         self.bot_type = "momentum" # Explicitly set bot type
@@ -27,6 +50,7 @@ class MomentumTradingBot(BaseTradingBot):
         self.macd_slow: int = int(self.config_params.get('macd_slow', 26))
         self.macd_signal: int = int(self.config_params.get('macd_signal', 9))
         self.candle_interval: str = self.config_params.get('candle_interval', '1h') 
+        self.interval_seconds: int = self._get_interval_seconds() # Parsed once; used for scheduling and candle gaps
         self.lookback_periods: int = int(self.config_params.get('lookback_periods', 100)) 
         self.trade_quantity: float = float(self.config_params.get('trade_quantity', 0)) # Base asset quantity
         self.stop_loss_percent: Optional[float] = float(self.config_params.get('stop_loss_percent', 0)) # e.g., 0.02 for 2%
@@ -36,6 +60,20 @@ class MomentumTradingBot(BaseTradingBot):
         self.current_entry_price: Optional[float] = None # Track entry price for stop-loss calc
         self.stop_loss_price: Optional[float] = None # Calculated stop-loss level
         
+        # --- Streaming Indicator State (through the last closed candle) ---
+        # RSI gains/losses and MACD lines are EMAs (adjust=False), matching utils.indicators
+        self._rsi_alpha: float = 2 / (self.rsi_period + 1)
+        self._fast_alpha: float = 2 / (self.macd_fast + 1)
+        self._slow_alpha: float = 2 / (self.macd_slow + 1)
+        self._signal_alpha: float = 2 / (self.macd_signal + 1)
+        self._last_candle_open: Optional[int] = None # Open time (ms) of the last candle folded into the state
+        self._last_close: float = 0.0
+        self._avg_gain: float = 0.0
+        self._avg_loss: float = 0.0
+        self._ema_fast: float = 0.0
+        self._ema_slow: float = 0.0
+        self._macd_signal: float = 0.0
+        
         if self.trade_quantity <= 0:
              raise ValueError("Trade quantity must be positive.")
 
@@ -47,82 +85,127 @@ class MomentumTradingBot(BaseTradingBot):
 
         self.logger.info(f"Momentum Bot '{self.name}' initialized with params: {log_params}")
 
+        # --- Derived Constants (fixed for the bot's lifetime) ---
+        self._stop_loss_factor: Optional[float] = (1 - self.stop_loss_percent) if self.stop_loss_percent else None
+        self._required_candles: int = max(self.lookback_periods, self.macd_slow + self.macd_signal) + 5
+        self._interval_ms: int = self.interval_seconds * 1000
+        # Shared with other bots on the same symbol/interval; capped so stop-loss checks never see very stale prices
+        self._kline_ttl: float = min(self.interval_seconds / 2, KLINE_CACHE_MAX_TTL)
+        # Start string for the paginated history fetch, used only when required_candles exceeds one request
+        self._history_start_str: str = f"{self._required_candles * self.interval_seconds // 60} minutes ago UTC"
+
     def _get_interval_seconds(self) -> int:
         """Helper to convert interval string to seconds for sleep."""
-        # TODO: Make this more robust using a library or regex
-        try:
-            if 'm' in self.candle_interval:
-                return int(self.candle_interval.replace('m', '')) * 60
-            elif 'h' in self.candle_interval:
-                return int(self.candle_interval.replace('h', '')) * 3600
-            elif 'd' in self.candle_interval:
-                return int(self.candle_interval.replace('d', '')) * 86400
-            elif 'w' in self.candle_interval:
-                 return int(self.candle_interval.replace('w', '')) * 604800
-            else: # Assume minutes if no unit? Or raise error?
-                 return int(self.candle_interval) * 60 
-        except ValueError:
-             self.logger.warning(f"Could not parse candle interval '{self.candle_interval}'. Defaulting to 1 hour.")
-             return 3600
+        interval_seconds = _INTERVAL_SECONDS.get(self.candle_interval)
+        if interval_seconds is None:
+            self.logger.warning(f"Could not parse candle interval '{self.candle_interval}'. Defaulting to 1 hour.")
+            return 3600
+        return interval_seconds
+
+    def _seconds_until_next_candle(self) -> float:
+        """
+        Seconds until just after the current candle closes. Bots on the same interval all wake at the
+        boundary, so their kline requests coalesce in the shared cache into a single fetch.
+        Intervals longer than a day don't align to epoch multiples (weeks start Monday, months vary), so
+        those bots keep a plain fixed period.
+        """
+        interval_seconds = self.interval_seconds
+        if interval_seconds > 86400:
+            return float(interval_seconds)
+        return interval_seconds - (time.time() % interval_seconds) + min(CANDLE_CLOSE_DELAY, interval_seconds / 2)
+
+    def _next_indicator_state(self, close: float) -> Tuple[float, float, float, float, float]:
+        """Returns (avg_gain, avg_loss, ema_fast, ema_slow, macd_signal) after one more close, without committing it."""
+        delta = close - self._last_close
+        avg_gain = self._avg_gain + self._rsi_alpha * (max(0.0, delta) - self._avg_gain)
+        avg_loss = self._avg_loss + self._rsi_alpha * (max(0.0, -delta) - self._avg_loss)
+        ema_fast = self._ema_fast + self._fast_alpha * (close - self._ema_fast)
+        ema_slow = self._ema_slow + self._slow_alpha * (close - self._ema_slow)
+        macd_signal = self._macd_signal + self._signal_alpha * ((ema_fast - ema_slow) - self._macd_signal)
+        return avg_gain, avg_loss, ema_fast, ema_slow, macd_signal
+
+    def _commit_close(self, close: float):
+        """Folds a closed candle's close price into the streaming indicator state."""
+        self._avg_gain, self._avg_loss, self._ema_fast, self._ema_slow, self._macd_signal = self._next_indicator_state(close)
+        self._last_close = close
+
+    def _seed_indicators(self, closes: np.ndarray):
+        """Rebuilds the indicator state from a full history of closed candle closes (oldest first)."""
+        self._avg_gain, self._avg_loss, self._ema_fast, self._ema_slow, self._macd_signal = calculate_momentum_state(
+            closes, self.rsi_period, self.macd_fast, self.macd_slow, self.macd_signal
+        )
+        self._last_close = float(closes[-1])
+
+    async def _refresh_candles(self) -> Optional[list]:
+        """
+        Brings the indicator state up to the last closed candle and returns the latest (still open) kline.
+        Seeds from a full history on the first call or after a gap; afterwards fetches only the last two candles.
+        """
+        required_candles = self._required_candles
+        if self._last_candle_open is not None:
+            klines = await kline_cache.get_recent_klines(self.symbol, self.candle_interval, limit=2, ttl=self._kline_ttl)
+            if not klines or len(klines) < 2:
+                self.logger.warning(f"Could not fetch recent klines for {self.symbol}. Skipping check.")
+                return None
+            closed = klines[-2]
+            if closed[0] <= self._last_candle_open + self._interval_ms:
+                if closed[0] > self._last_candle_open:
+                    self._commit_close(float(closed[4]))
+                    self._last_candle_open = closed[0]
+                return klines[-1]
+            self.logger.info(f"Missed candles for {self.symbol}. Reseeding indicators from history.")
+
+        if required_candles <= MAX_KLINES_PER_REQUEST:
+            # The last `required_candles` candles in one request; also warms the shared cache for the 2-candle updates
+            klines = await kline_cache.get_recent_klines(self.symbol, self.candle_interval, limit=required_candles, ttl=self._kline_ttl)
+        else:
+            klines = await get_historical_klines(self.symbol, self.candle_interval, start_str=self._history_start_str)
+        if not klines or len(klines) < required_candles:
+            self.logger.warning(f"Insufficient kline data ({len(klines) if klines else 0} candles < {required_candles}). Skipping check.")
+            self._last_candle_open = None
+            return None
+
+        # Only the close column is needed; Binance sends prices as strings
+        self._seed_indicators(np.array([k[4] for k in klines[:-1]], dtype=np.float64))
+        self._last_candle_open = klines[-2][0]
+        return klines[-1]
 
     async def _run_logic(self):
         """Core logic loop for the momentum bot."""
         self.logger.info(f"Starting momentum logic loop for {self.symbol}...")
         
-        interval_seconds = self._get_interval_seconds()
-        
         while self.is_active:
+            # Schedule against the monotonic clock so processing time doesn't accumulate as drift
+            next_tick = time.monotonic() + self._seconds_until_next_candle()
             try:
-                self.logger.debug(f"Running check for {self.symbol} at {datetime.datetime.utcnow()} UTC")
-                
-                # 1. Fetch Historical Data
-                required_candles = max(self.lookback_periods, self.macd_slow + self.macd_signal) + 5 
-                # Use a more reliable way to get start time string if possible
-                # Example: Calculate timestamp and format, or use relative like "X hours ago UTC"
-                # For simplicity, keeping the minute-based calculation for now
-                minutes_ago = required_candles * interval_seconds // 60
-                start_time_str = f"{minutes_ago} minutes ago UTC" 
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(f"Running check for {self.symbol} at {time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())} UTC")
                 
-                klines = await get_historical_klines(self.symbol, self.candle_interval, start_str=start_time_str)
-                
-                if not klines or len(klines) < required_candles:
-                    self.logger.warning(f"Insufficient kline data ({len(klines) if klines else 0} candles < {required_candles}). Skipping check.")
-                    await asyncio.sleep(interval_seconds) 
+                # 1. Update indicator state with newly closed candles (one small request once seeded)
+                latest = await self._refresh_candles()
+                if latest is None:
+                    if await self._wait_for_stop(max(0.0, next_tick - time.monotonic())): break
                     continue
 
-                # 2. Prepare DataFrame
-                df = pd.DataFrame(klines, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_asset_volume', 'number_of_trades', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df.set_index('timestamp', inplace=True)
-                df['close'] = df['close'].astype(float)
-                df['low'] = df['low'].astype(float) # Need low price for stop-loss check
-                
-                # 3. Calculate Indicators
-                df['rsi'] = calculate_rsi(df['close'], self.rsi_period)
-                macd_df = calculate_macd(df['close'], self.macd_fast, self.macd_slow, self.macd_signal)
-                df = pd.concat([df, macd_df], axis=1)
+                # 2. Evaluate indicators on the latest (still open) candle without committing it
+                close = float(latest[4])
+                low = float(latest[3]) # Need low price for stop-loss check
+                avg_gain, avg_loss, ema_fast, ema_slow, signal = self._next_indicator_state(close)
+                rsi = 100.0 if avg_loss == 0 else 100 - (100 / (1 + avg_gain / avg_loss))
+                macd = ema_fast - ema_slow
+                buy_signal, sell_signal = calculate_momentum_signals(rsi, macd, signal, self.rsi_oversold, self.rsi_overbought)
                 
-                # Drop NaNs after indicator calculation
-                df.dropna(inplace=True)
-                if df.empty:
-                     self.logger.warning("DataFrame empty after calculating indicators and dropping NaNs. Skipping check.")
-                     await asyncio.sleep(interval_seconds)
-                     continue
-
-                # Get the latest complete candle's data
-                latest = df.iloc[-1] # Use last row now that NaNs are dropped
-                
-                self.logger.debug(f"Latest data for {self.symbol}: Close={latest['close']:.4f}, RSI={latest['rsi']:.2f}, MACD={latest['MACD']:.4f}, Signal={latest['Signal']:.4f}")
+                self.logger.debug(f"Latest data for {self.symbol}: Close={close:.4f}, RSI={rsi:.2f}, MACD={macd:.4f}, Signal={signal:.4f}")
 
-                # 4. Apply Trading Logic & State Management
+                # 3. Apply Trading Logic & State Management
                 
                 # --- Stop Loss Check (only if in position) ---
-                if self.in_position and self.stop_loss_price and latest['low'] <= self.stop_loss_price:
-                     self.logger.info(f"STOP LOSS triggered for {self.symbol} at low price {latest['low']:.4f} (Stop @ {self.stop_loss_price:.4f})")
+                if self.in_position and self.stop_loss_price and low <= self.stop_loss_price:
+                     self.logger.info(f"STOP LOSS triggered for {self.symbol} at low price {low:.4f} (Stop @ {self.stop_loss_price:.4f})")
                      # Use current position size for selling
                      sell_quantity = self.current_position_size 
                      if sell_quantity > 0:
-                         order_result = await self._place_order(side='SELL', order_type='MARKET', quantity=sell_quantity) 
+                         order_result = await self._place_order(side=SELL, order_type=MARKET, quantity=sell_quantity) 
                          if order_result and order_result.get('status') == 'FILLED':
                              self.logger.info(f"Exited LONG position for {self.symbol} due to STOP LOSS.")
                              # Reset state AFTER successful exit
@@ -140,18 +223,17 @@ class MomentumTradingBot(BaseTradingBot):
 
                 # --- Entry Signal Check (only if not in position) ---
                 elif not self.in_position:
-                    buy_signal = latest['rsi'] > self.rsi_oversold and latest['MACD'] > latest['Signal']
                     if buy_signal:
-                         self.logger.info(f"BUY SIGNAL for {self.symbol}: RSI ({latest['rsi']:.2f}) > {self.rsi_oversold} and MACD bullish.")
-                         order_result = await self._place_order(side='BUY', order_type='MARKET', quantity=self.trade_quantity)
+                         self.logger.info(f"BUY SIGNAL for {self.symbol}: RSI ({rsi:.2f}) > {self.rsi_oversold} and MACD bullish.")
+                         order_result = await self._place_order(side=BUY, order_type=MARKET, quantity=self.trade_quantity)
                          if order_result and order_result.get('status') == 'FILLED':
                              self.in_position = True
                              # Use actual fill price if available, else candle close
-                             entry_price_approx = self._parse_order_to_trade_details(order_result, 'BUY', 'MARKET')['price'] or latest['close']
+                             entry_price_approx = self._parse_order_to_trade_details(order_result, BUY, MARKET)['price'] or close
                              self.current_entry_price = entry_price_approx
                              # Set stop loss price if configured
-                             if self.stop_loss_percent:
-                                 self.stop_loss_price = self.current_entry_price * (1 - self.stop_loss_percent)
+                             if self._stop_loss_factor is not None:
+                                 self.stop_loss_price = self.current_entry_price * self._stop_loss_factor
                                  self.logger.info(f"Entered LONG position for {self.symbol} @ ~{self.current_entry_price:.4f}. Stop loss set to {self.stop_loss_price:.4f}")
                              else:
                                  self.logger.info(f"Entered LONG position for {self.symbol} @ ~{self.current_entry_price:.4f}. No stop loss.")
@@ -160,12 +242,11 @@ class MomentumTradingBot(BaseTradingBot):
                              
                 # --- Regular Exit Signal Check (only if in position and stop loss wasn't hit) ---
                 elif self.in_position: 
-                    sell_signal = latest['rsi'] < self.rsi_overbought or latest['MACD'] < latest['Signal']
                     if sell_signal:
-                        self.logger.info(f"SELL SIGNAL for {self.symbol}: RSI ({latest['rsi']:.2f}) < {self.rsi_overbought} or MACD bearish.")
+                        self.logger.info(f"SELL SIGNAL for {self.symbol}: RSI ({rsi:.2f}) < {self.rsi_overbought} or MACD bearish.")
                         sell_quantity = self.current_position_size # Sell the entire position
                         if sell_quantity > 0:
-                            order_result = await self._place_order(side='SELL', order_type='MARKET', quantity=sell_quantity)
+                            order_result = await self._place_order(side=SELL, order_type=MARKET, quantity=sell_quantity)
                             if order_result and order_result.get('status') == 'FILLED':
                                 self.logger.info(f"Exited LONG position for {self.symbol} based on signal.")
                                 # Reset state
@@ -181,16 +262,9 @@ class MomentumTradingBot(BaseTradingBot):
                              self.stop_loss_price = None
 
 
-                # 5. Wait for the next interval, checking for stop signal periodically
-                self.logger.debug(f"Check complete for {self.symbol}. Waiting for next interval ({interval_seconds}s)...")
-                sleep_interval = 5 # Check every 5 seconds
-                remaining_sleep = interval_seconds
-                while remaining_sleep > 0 and self.is_active:
-                     await asyncio.sleep(min(sleep_interval, remaining_sleep))
-                     remaining_sleep -= sleep_interval
-                
-                # If loop exited because is_active became false, break outer loop
-                if not self.is_active: break
+                # 4. Wait for the next interval, waking immediately on stop
+                self.logger.debug(f"Check complete for {self.symbol}. Waiting {max(0.0, next_tick - time.monotonic()):.0f}s for the next candle...")
+                if await self._wait_for_stop(max(0.0, next_tick - time.monotonic())): break
 
             except asyncio.CancelledError:
                 self.logger.info(f"Momentum logic loop for {self.symbol} cancelled.")
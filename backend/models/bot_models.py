@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, validator
-from typing import Dict, Any, Optional
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
+from typing import Dict, Any, List, Literal, Optional
 import uuid
 
 # Pydantic models for bot configuration and status
@@ -7,20 +7,14 @@ import uuid
 class BotConfigBase(BaseModel):
     """Base model for bot configuration, used for creation."""
     name: str = Field(..., min_length=1, max_length=100, description="User-defined name for the bot instance")
-    bot_type: str = Field(..., description="Type of the bot ('momentum', 'grid', 'dca')")
+    bot_type: Literal['momentum', 'grid', 'dca'] = Field(..., description="Type of the bot ('momentum', 'grid', 'dca')")
     symbol: str = Field(..., description="Trading symbol (e.g., 'BTCUSDT')")
     config_params: Dict[str, Any] = Field(..., description="Bot-specific parameters (e.g., grid levels, indicator settings)")
     is_active: bool = Field(default=False, description="Whether the bot should be actively trading")
 
-    @validator('bot_type')
-    def bot_type_must_be_valid(cls, v):
-        allowed_types = {'momentum', 'grid', 'dca'}
-        if v not in allowed_types:
-            raise ValueError(f"bot_type must be one of {allowed_types}")
-        return v
-
-    @validator('symbol')
-    def symbol_to_uppercase(cls, v):
+    @field_validator('symbol')
+    @classmethod
+    def symbol_to_uppercase(cls, v: str) -> str:
         return v.upper()
 
 class BotConfigCreate(BotConfigBase):
@@ -40,8 +34,7 @@ class BotConfigResponse(BotConfigBase):
     created_at: Optional[Any] = None # Using Any to avoid datetime import issues initially
     updated_at: Optional[Any] = None
 
-    class Config:
-        from_attributes = True # Pydantic V2 equivalent of orm_mode
+    model_config = ConfigDict(from_attributes=True) # Pydantic V2 equivalent of orm_mode
 
 class BotStatusResponse(BaseModel):
     """Model representing the runtime status of a bot instance."""
@@ -53,3 +46,6 @@ class BotStatusResponse(BaseModel):
     is_running: bool = Field(..., description="Actual runtime status (processing/idle)")
     config_params: Dict[str, Any] = Field(..., description="Current configuration parameters")
     # Add more status fields as needed from BaseTradingBot.get_status()
+
+# Validates a list of DB rows in a single call (UUID strings are coerced); built once and reused
+BotConfigResponseList = TypeAdapter(List[BotConfigResponse])
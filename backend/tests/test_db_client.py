@@ -0,0 +1,122 @@
+"""
+Run from the repository root: python -m unittest backend.tests.test_db_client
+"""
+import asyncio
+import datetime
+import os
+import threading
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+os.environ.setdefault('SUPABASE_URL', 'http://localhost')
+os.environ.setdefault('SUPABASE_SERVICE_ROLE_KEY', 'test-key')
+
+from backend.utils import db_client
+from backend.bots.dca_bot import DCATradingBot
+
+class _FakeQuery:
+    """Stands in for supabase's synchronous query builder: chained filters, then a blocking execute()."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+        self.execute_thread = None
+
+    def __getattr__(self, name):
+        def chain(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return chain
+
+    def execute(self):
+        self.execute_thread = threading.get_ident()
+        return SimpleNamespace(data=self.rows)
+
+class GetLatestTradeTest(unittest.TestCase):
+    def _run_with_rows(self, rows, coro_factory):
+        query = _FakeQuery(rows)
+        client = SimpleNamespace(table=lambda name: query)
+        with mock.patch.object(db_client, 'get_supabase_backend_client', return_value=client):
+            result = asyncio.run(coro_factory())
+        return query, result
+
+    def test_returns_latest_row_without_blocking_the_loop(self):
+        row = {'side': 'BUY', 'timestamp': '2024-05-01T12:00:00+00:00'}
+        query, result = self._run_with_rows([row], lambda: db_client.get_latest_trade(uuid.uuid4(), side='BUY'))
+        self.assertEqual(result, row)
+        self.assertIn(('order', ('timestamp',), {'desc': True}), query.calls)
+        self.assertIn(('eq', ('side', 'BUY'), {}), query.calls)
+        self.assertNotEqual(query.execute_thread, threading.get_ident())
+
+    def test_returns_none_when_no_trades(self):
+        _, result = self._run_with_rows([], lambda: db_client.get_latest_trade(uuid.uuid4()))
+        self.assertIsNone(result)
+
+    def test_dca_bot_restores_last_purchase_time(self):
+        bot = DCATradingBot(
+            {'id': uuid.uuid4(), 'name': 'dca', 'symbol': 'BTCUSDT', 'config_params': {'purchase_amount_quote': 10}},
+            str(uuid.uuid4()),
+        )
+        row = {'side': 'BUY', 'timestamp': '2024-05-01T12:00:00+00:00'}
+        self._run_with_rows([row], bot._restore_last_purchase_time)
+        self.assertEqual(bot.last_purchase_time, datetime.datetime(2024, 5, 1, 12, tzinfo=datetime.timezone.utc))
+
+class PostgrestFallbackTest(unittest.TestCase):
+    """Without the asyncpg pool, batched writes go through the synchronous supabase client."""
+
+    def _run(self, coro_factory):
+        query = _FakeQuery([{'id': 1}])
+        client = SimpleNamespace(table=lambda name: query)
+        with mock.patch.object(db_client, 'get_supabase_backend_client', return_value=client), \
+             mock.patch.object(db_client, 'get_pg_pool', mock.AsyncMock(return_value=None)):
+            result = asyncio.run(coro_factory())
+        return query, result
+
+    TRADE = {
+        'symbol': 'BTCUSDT', 'side': 'BUY', 'type': 'LIMIT', 'price': 1.0, 'quantity': 2.0,
+        'timestamp': '2024-05-01T12:00:00+00:00',
+    }
+
+    def test_flush_inserts_buffered_trades(self):
+        async def record_and_flush():
+            await db_client.record_trade(uuid.uuid4(), uuid.uuid4(), self.TRADE)
+            await db_client.flush_db_buffers()
+
+        query, _ = self._run(record_and_flush)
+        inserts = [args[0] for name, args, _ in query.calls if name == 'insert']
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(inserts[0][0]['symbol'], 'BTCUSDT')
+        self.assertIsNotNone(query.execute_thread)
+        self.assertNotEqual(query.execute_thread, threading.get_ident())
+
+    def test_close_stops_flusher_after_writing_buffered_rows(self):
+        async def record_and_close():
+            await db_client.record_trade(uuid.uuid4(), uuid.uuid4(), self.TRADE)
+            flusher = db_client._trade_buffer._flusher_task
+            await db_client.close_db_buffers()
+            return flusher
+
+        query, flusher = self._run(record_and_close)
+        self.assertTrue(flusher.cancelled())
+        self.assertIsNone(db_client._trade_buffer._flusher_task)
+        self.assertEqual(len([name for name, _, _ in query.calls if name == 'insert']), 1)
+
+    def test_flusher_restarts_on_a_new_loop(self):
+        async def record_and_wait():
+            await db_client.record_trade(uuid.uuid4(), uuid.uuid4(), self.TRADE)
+            await asyncio.sleep(0.05) # Left to the background flusher
+
+        with mock.patch.object(db_client._trade_buffer, 'flush_interval', 0.01):
+            for _ in range(2): # Each asyncio.run uses a fresh loop; the first one's flusher dies with it
+                query, _ = self._run(record_and_wait)
+                self.assertEqual(len([name for name, _, _ in query.calls if name == 'insert']), 1)
+
+    def test_bulk_record_performance_counts_written_snapshots(self):
+        snapshot = {'timestamp': '2024-05-01T12:00:00+00:00', 'total_pnl': 1.5, 'total_trades': 3}
+        _, written = self._run(lambda: db_client.bulk_record_performance(uuid.uuid4(), uuid.uuid4(), [snapshot] * 3))
+        self.assertEqual(written, 3)
+
+if __name__ == '__main__':
+    unittest.main()
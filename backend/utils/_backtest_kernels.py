@@ -0,0 +1,218 @@
+import numpy as np
+
+from ._njit import njit
+
+# Compiled simulation loops behind utils.backtest. Each kernel walks the bars once and returns
+# the per-bar equity curve plus compact trade arrays; formatting into dicts happens in Python.
+
+SIDE_BUY = 1
+SIDE_SELL = -1
+
+@njit(cache=True)
+def _momentum_sim(close, buy, sell, trade_quantity, initial_cash, commission_rate):
+    """
+    Momentum state machine over precomputed signal masks.
+    Returns (equity, trade_idx, trade_side, trade_price, trade_qty) where equity values the holdings at
+    each bar *before* that bar's trade, and the trade arrays are trimmed to the trades made.
+    """
+    n = close.shape[0]
+    equity = np.empty(n)
+    trade_idx = np.empty(n, dtype=np.int64)
+    trade_side = np.empty(n, dtype=np.int8)
+    trade_price = np.empty(n)
+    trade_qty = np.empty(n)
+    n_trades = 0
+    cur_cash = initial_cash
+    cur_pos = 0.0
+    last_side = 0
+    for i in range(n):
+        price = close[i]
+        equity[i] = cur_cash + cur_pos * price
+        if buy[i] and cur_pos == 0 and last_side != SIDE_BUY:
+            cost = price * trade_quantity * (1 + commission_rate)
+            if cur_cash >= cost:
+                cur_cash -= cost
+                cur_pos += trade_quantity
+                last_side = SIDE_BUY
+                trade_idx[n_trades] = i
+                trade_side[n_trades] = SIDE_BUY
+                trade_price[n_trades] = price
+                trade_qty[n_trades] = trade_quantity
+                n_trades += 1
+        elif sell[i] and cur_pos > 0 and last_side != SIDE_SELL:
+            cur_cash += price * cur_pos * (1 - commission_rate)
+            last_side = SIDE_SELL
+            trade_idx[n_trades] = i
+            trade_side[n_trades] = SIDE_SELL
+            trade_price[n_trades] = price
+            trade_qty[n_trades] = cur_pos
+            n_trades += 1
+            cur_pos = 0.0
+    return (equity, trade_idx[:n_trades], trade_side[:n_trades],
+            trade_price[:n_trades], trade_qty[:n_trades])
+
+@njit(cache=True)
+def _grow(arr, capacity):
+    out = np.empty(capacity, dtype=arr.dtype)
+    out[:arr.shape[0]] = arr
+    return out
+
+@njit(cache=True)
+def _highest_pending(pending):
+    for k in range(pending.shape[0] - 1, -1, -1):
+        if pending[k]:
+            return k
+    return -1
+
+@njit(cache=True)
+def _lowest_pending(pending):
+    for k in range(pending.shape[0]):
+        if pending[k]:
+            return k
+    return pending.shape[0]
+
+@njit(cache=True)
+def _pending_in_order(pending, seq, prices, limit, at_or_above):
+    """Indices of pending orders priced at or above (or at or below) `limit`, in placement order."""
+    hits = np.empty(pending.shape[0], dtype=np.int64)
+    m = 0
+    for k in range(pending.shape[0]):
+        if pending[k] and ((prices[k] >= limit) if at_or_above else (prices[k] <= limit)):
+            hits[m] = k
+            m += 1
+    hits = hits[:m]
+    if m > 1:
+        hits = hits[np.argsort(seq[hits])]
+    return hits
+
+@njit(cache=True)
+def _grid_sim(low, high, close, levels, initial_buy_qty, initial_cash, commission_rate):
+    """
+    Grid fill simulation with pending orders held per level index. A filled BUY at level k queues a
+    SELL at k + 1 and a filled SELL at level k queues a BUY at k - 1; buys are checked before sells
+    on each bar and orders at a side fill in the order they were placed. The highest pending buy and
+    lowest pending sell are tracked so bars that can't reach either skip the per-level scan.
+    `initial_buy_qty` holds the starting buy quantity per level (0 where no order is placed).
+    Returns (equity, trade_bar, trade_level, trade_side, trade_qty) with equity valued before each
+    bar's fills.
+    """
+    n = close.shape[0]
+    g = levels.shape[0]
+    buy_pending = initial_buy_qty > 0
+    buy_qty = initial_buy_qty.copy()
+    buy_seq = np.zeros(g, dtype=np.int64)
+    sell_pending = np.zeros(g, dtype=np.bool_)
+    sell_qty = np.zeros(g)
+    sell_seq = np.zeros(g, dtype=np.int64)
+    next_seq = 0
+    for k in range(g):
+        if buy_pending[k]:
+            buy_seq[k] = next_seq
+            next_seq += 1
+
+    best_buy = _highest_pending(buy_pending) # -1 when no buy is pending
+    best_sell = g # g when no sell is pending
+
+    equity = np.empty(n)
+    capacity = max(16, 2 * n)
+    trade_bar = np.empty(capacity, dtype=np.int64)
+    trade_level = np.empty(capacity, dtype=np.int64)
+    trade_side = np.empty(capacity, dtype=np.int8)
+    trade_qty = np.empty(capacity)
+    n_trades = 0
+    cur_cash = initial_cash
+    cur_pos = 0.0
+    for i in range(n):
+        equity[i] = cur_cash + cur_pos * close[i]
+
+        if best_buy >= 0 and levels[best_buy] >= low[i]:
+            for k in _pending_in_order(buy_pending, buy_seq, levels, low[i], True):
+                qty = buy_qty[k]
+                cost = levels[k] * qty * (1 + commission_rate)
+                if cur_cash >= cost:
+                    cur_cash -= cost
+                    cur_pos += qty
+                    buy_pending[k] = False
+                    if n_trades == capacity:
+                        capacity *= 2
+                        trade_bar = _grow(trade_bar, capacity)
+                        trade_level = _grow(trade_level, capacity)
+                        trade_side = _grow(trade_side, capacity)
+                        trade_qty = _grow(trade_qty, capacity)
+                    trade_bar[n_trades] = i
+                    trade_level[n_trades] = k
+                    trade_side[n_trades] = SIDE_BUY
+                    trade_qty[n_trades] = qty
+                    n_trades += 1
+                    if k + 1 < g:
+                        if not sell_pending[k + 1]:
+                            sell_seq[k + 1] = next_seq
+                            next_seq += 1
+                        sell_pending[k + 1] = True
+                        sell_qty[k + 1] = qty
+                        best_sell = min(best_sell, k + 1)
+            best_buy = _highest_pending(buy_pending)
+
+        if best_sell < g and levels[best_sell] <= high[i]:
+            for k in _pending_in_order(sell_pending, sell_seq, levels, high[i], False):
+                qty = sell_qty[k]
+                if cur_pos >= qty:
+                    cur_cash += levels[k] * qty * (1 - commission_rate)
+                    cur_pos -= qty
+                    sell_pending[k] = False
+                    if n_trades == capacity:
+                        capacity *= 2
+                        trade_bar = _grow(trade_bar, capacity)
+                        trade_level = _grow(trade_level, capacity)
+                        trade_side = _grow(trade_side, capacity)
+                        trade_qty = _grow(trade_qty, capacity)
+                    trade_bar[n_trades] = i
+                    trade_level[n_trades] = k
+                    trade_side[n_trades] = SIDE_SELL
+                    trade_qty[n_trades] = qty
+                    n_trades += 1
+                    if k > 0:
+                        if not buy_pending[k - 1]:
+                            buy_seq[k - 1] = next_seq
+                            next_seq += 1
+                        buy_pending[k - 1] = True
+                        buy_qty[k - 1] = qty
+                        best_buy = max(best_buy, k - 1)
+            best_sell = _lowest_pending(sell_pending)
+    return (equity, trade_bar[:n_trades], trade_level[:n_trades],
+            trade_side[:n_trades], trade_qty[:n_trades])
+
+@njit(cache=True)
+def _equity_stats(equity, periods_per_year):
+    """
+    One pass over the equity curve returning (max_drawdown, sharpe_ratio):
+    the largest fall from a running peak as a fraction of that peak (bars with a non-positive peak count as 0),
+    and the annualized Sharpe ratio (zero risk-free rate) of bar-to-bar returns, with mean and variance
+    accumulated Welford-style. The Sharpe ratio is 0.0 when undefined.
+    """
+    peak = -np.inf
+    max_drawdown = 0.0
+    n = 0
+    mean = 0.0
+    m2 = 0.0
+    for i in range(equity.shape[0]):
+        value = equity[i]
+        if value > peak:
+            peak = value
+        if peak > 0:
+            drawdown = (peak - value) / peak
+            if drawdown > max_drawdown:
+                max_drawdown = drawdown
+        if i == 0:
+            continue
+        prev = equity[i - 1]
+        if prev == 0:
+            continue
+        r = value / prev - 1.0
+        n += 1
+        delta = r - mean
+        mean += delta / n
+        m2 += delta * (r - mean)
+    if n < 2 or m2 <= 0:
+        return max_drawdown, 0.0
+    return max_drawdown, mean / np.sqrt(m2 / (n - 1)) * np.sqrt(periods_per_year)
@@ -0,0 +1,159 @@
+import numpy as np
+
+from ._njit import njit
+
+# Compiled recurrences behind utils.indicators. Inputs are 1D float64 or float32 arrays; outputs have the
+# input's length and dtype, with NaN where the indicator is undefined. Running state is always kept in
+# float64 scalars, so float32 inputs only narrow what is read and written, not the recurrences themselves.
+
+@njit(cache=True)
+def _sma(values, window):
+    """
+    Rolling mean with min_periods=window: NaN until `window` values are in view and wherever one of them is NaN.
+    The running sum keeps separate Kahan compensations for values entering and leaving the window (as pandas'
+    roll_mean does), so it doesn't drift over long series.
+    """
+    n = values.shape[0]
+    out = np.full(n, np.nan, dtype=values.dtype)
+    total = 0.0
+    add_compensation = 0.0
+    remove_compensation = 0.0
+    nan_count = 0
+    for i in range(n):
+        if i >= window:
+            old = values[i - window]
+            if np.isnan(old):
+                nan_count -= 1
+            else:
+                y = -old - remove_compensation
+                t = total + y
+                remove_compensation = (t - total) - y
+                total = t
+        v = values[i]
+        if np.isnan(v):
+            nan_count += 1
+        else:
+            y = v - add_compensation
+            t = total + y
+            add_compensation = (t - total) - y
+            total = t
+        if i >= window - 1 and nan_count == 0:
+            out[i] = total / window
+    return out
+
+@njit(cache=True)
+def _ema(values, window):
+    """EMA with span=window, adjust=False, min_periods=window; leading NaNs are skipped."""
+    n = values.shape[0]
+    out = np.full(n, np.nan, dtype=values.dtype)
+    alpha = 2.0 / (window + 1)
+    ema = 0.0
+    count = 0
+    for i in range(n):
+        v = values[i]
+        if np.isnan(v):
+            if count >= window:
+                out[i] = ema
+            continue
+        if count == 0:
+            ema = v
+        else:
+            ema = ema + alpha * (v - ema)
+        count += 1
+        if count >= window:
+            out[i] = ema
+    return out
+
+@njit(cache=True)
+def _rsi(close, window):
+    """RSI over EMA-smoothed gains/losses; the first `window` values are NaN."""
+    n = close.shape[0]
+    out = np.full(n, np.nan, dtype=close.dtype)
+    if n < window + 1:
+        return out
+    alpha = 2.0 / (window + 1)
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, n):
+        delta = close[i] - close[i - 1]
+        # max() with the zero first selects without branching and still maps a NaN delta to 0
+        gain = max(0.0, delta)
+        loss = max(0.0, -delta)
+        avg_gain = avg_gain + alpha * (gain - avg_gain)
+        avg_loss = avg_loss + alpha * (loss - avg_loss)
+        if i >= window:
+            if avg_loss == 0:
+                out[i] = 100.0
+            else:
+                out[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return out
+
+@njit(cache=True)
+def _macd(close, fast, slow, signal):
+    """
+    Returns (macd_line, signal_line, histogram) from one pass that carries the fast, slow and signal EMAs
+    as running state. Matches _ema(close, fast) - _ema(close, slow) and _ema of that line for the signal.
+    """
+    n = close.shape[0]
+    macd_line = np.full(n, np.nan, dtype=close.dtype)
+    signal_line = np.full(n, np.nan, dtype=close.dtype)
+    histogram = np.full(n, np.nan, dtype=close.dtype)
+    fast_alpha = 2.0 / (fast + 1)
+    slow_alpha = 2.0 / (slow + 1)
+    signal_alpha = 2.0 / (signal + 1)
+    ema_fast = 0.0
+    ema_slow = 0.0
+    ema_signal = 0.0
+    count = 0
+    signal_count = 0
+    for i in range(n):
+        v = close[i]
+        if not np.isnan(v): # NaN closes are skipped; the EMAs hold their last value
+            if count == 0:
+                ema_fast = v
+                ema_slow = v
+            else:
+                ema_fast = ema_fast + fast_alpha * (v - ema_fast)
+                ema_slow = ema_slow + slow_alpha * (v - ema_slow)
+            count += 1
+        if count < fast or count < slow:
+            continue
+        m = ema_fast - ema_slow
+        macd_line[i] = m
+        if signal_count == 0:
+            ema_signal = m
+        else:
+            ema_signal = ema_signal + signal_alpha * (m - ema_signal)
+        signal_count += 1
+        if signal_count >= signal:
+            signal_line[i] = ema_signal
+            histogram[i] = m - ema_signal
+    return macd_line, signal_line, histogram
+
+@njit(cache=True)
+def _momentum_state(close, rsi_window, fast, slow, signal):
+    """
+    Runs the RSI and MACD recurrences over `close` and returns only the final state:
+    (avg_gain, avg_loss, ema_fast, ema_slow, macd_signal), for seeding streaming updates.
+    """
+    rsi_alpha = 2.0 / (rsi_window + 1)
+    fast_alpha = 2.0 / (fast + 1)
+    slow_alpha = 2.0 / (slow + 1)
+    signal_alpha = 2.0 / (signal + 1)
+    avg_gain = 0.0
+    avg_loss = 0.0
+    ema_fast = close[0]
+    ema_slow = close[0]
+    macd_signal = 0.0
+    for i in range(1, close.shape[0]):
+        delta = close[i] - close[i - 1]
+        avg_gain = avg_gain + rsi_alpha * (max(0.0, delta) - avg_gain)
+        avg_loss = avg_loss + rsi_alpha * (max(0.0, -delta) - avg_loss)
+        ema_fast = ema_fast + fast_alpha * (close[i] - ema_fast)
+        ema_slow = ema_slow + slow_alpha * (close[i] - ema_slow)
+        # The signal EMA starts at the first MACD value once the slow EMA is defined
+        if i == slow - 1:
+            macd_signal = ema_fast - ema_slow
+        else:
+            macd_signal = macd_signal + signal_alpha * ((ema_fast - ema_slow) - macd_signal)
+    return avg_gain, avg_loss, ema_fast, ema_slow, macd_signal
@@ -0,0 +1,41 @@
+"""
+Ahead-of-time build of the indicator kernels into a native extension module, `_indicators_native`, so that
+workers load machine code at import instead of JIT-compiling (or loading numba's cache) on first use.
+
+Build at deploy time, from the directory containing `backend` (requires numba and a C compiler):
+
+    python -m backend.utils._indicators_aot
+
+utils.indicators uses the extension when it is importable and falls back to the @njit kernels otherwise.
+The extension must be rebuilt whenever _indicator_kernels.py changes.
+"""
+import os
+
+from numba.pycc import CC
+
+from . import _indicator_kernels as kernels
+
+NATIVE_MODULE = '_indicators_native'
+
+# Exported as `<kernel>_<dtype char>`, e.g. ema_d (float64) and ema_f (float32); see indicators._kernel
+_SIGNATURES = {
+    'sma': '{t}[:]({t}[:], i8)',
+    'ema': '{t}[:]({t}[:], i8)',
+    'rsi': '{t}[:]({t}[:], i8)',
+    'macd': 'UniTuple({t}[:], 3)({t}[:], i8, i8, i8)',
+}
+_DTYPES = {'d': 'f8', 'f': 'f4'}
+
+def build(output_dir: str = os.path.dirname(os.path.abspath(__file__))):
+    cc = CC(NATIVE_MODULE)
+    cc.output_dir = output_dir
+    for name, signature in _SIGNATURES.items():
+        kernel = getattr(kernels, f'_{name}').py_func
+        for char, numba_type in _DTYPES.items():
+            cc.export(f'{name}_{char}', signature.format(t=numba_type))(kernel)
+    # Only ever seeded from float64 closes
+    cc.export('momentum_state_d', 'UniTuple(f8, 5)(f8[:], i8, i8, i8, i8)')(kernels._momentum_state.py_func)
+    cc.compile()
+
+if __name__ == '__main__':
+    build()
@@ -0,0 +1,11 @@
+"""numba's njit when it is installed, otherwise a no-op decorator so kernels run as plain Python."""
+try:
+    from numba import njit
+except ImportError: # numba is optional
+    def njit(*args, **kwargs):
+        # Supports both @njit and @njit(cache=True, ...)
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        def decorator(func):
+            return func
+        return decorator
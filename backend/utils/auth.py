@@ -1,15 +1,19 @@
 import os
+import base64
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
 import httpx # Using httpx for async requests
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import jwk, jwt, JWTError
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError
+import orjson
 # from jose.utils import base64url_decode # Not needed for HS256
 import logging
 # from cachetools import TTLCache # Not needed for HS256
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
 # --- Environment Variables ---
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 # SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY") # No longer needed for JWKS fetch
@@ -18,6 +22,71 @@ SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET") # Get the JWT Secret
 if not SUPABASE_URL or not SUPABASE_JWT_SECRET:
     raise EnvironmentError("SUPABASE_URL or SUPABASE_JWT_SECRET environment variable not set.")
 
+# --- JWT Verification Settings (built once at import) ---
+# A prebuilt key object skips jose's per-call key parsing (JSON probe + HMAC key construction)
+_JWT_ALGORITHMS = ["HS256"]
+_JWT_KEY = jwk.construct(SUPABASE_JWT_SECRET, algorithm="HS256")
+_JWT_AUDIENCE = "authenticated" # Expected audience for Supabase JWTs
+_JWT_OPTIONS = {"verify_aud": True}
+
+def _reject_early(token: str):
+    """
+    Cheap pre-check on the *unverified* payload: raises JWTError for malformed, expired, or wrong-audience
+    tokens before any HMAC work. Passing it proves nothing; the token is still fully verified afterwards.
+    """
+    segments = token.split('.')
+    if len(segments) != 3:
+        raise JWTError("Not enough segments")
+    try:
+        payload_b64 = segments[1]
+        claims = orjson.loads(base64.urlsafe_b64decode(payload_b64 + '=' * (-len(payload_b64) % 4)))
+    except (ValueError, orjson.JSONDecodeError) as e: # binascii.Error is a ValueError
+        raise JWTError(f"Invalid payload segment: {e}")
+    if not isinstance(claims, dict):
+        raise JWTError("Invalid payload segment: not a JSON object")
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)) and exp < time.time():
+        raise ExpiredSignatureError("Signature has expired.")
+    aud = claims.get("aud")
+    if aud is not None and aud != _JWT_AUDIENCE and not (isinstance(aud, list) and _JWT_AUDIENCE in aud):
+        raise JWTClaimsError("Invalid audience")
+
+def decode_supabase_token(token: str) -> dict:
+    """Verifies a Supabase JWT's signature and claims and returns its payload. Raises JWTError if invalid."""
+    _reject_early(token)
+    return jwt.decode(token, _JWT_KEY, algorithms=_JWT_ALGORITHMS, audience=_JWT_AUDIENCE, options=_JWT_OPTIONS)
+
+# --- Verified Token Cache ---
+# The same token arrives on every request from a browser tab; remember who it belongs to until it
+# expires (at most _TOKEN_CACHE_TTL seconds) so repeat requests skip HMAC verification. Keyed by a
+# token digest so raw tokens aren't held in memory. LRU-bounded to _TOKEN_CACHE_MAXSIZE entries.
+_TOKEN_CACHE_MAXSIZE = 4096
+_TOKEN_CACHE_TTL = 300
+_token_cache: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict() # digest -> (expires_at, user_id)
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+def _get_cached_user(digest: bytes) -> Optional[str]:
+    entry = _token_cache.get(digest)
+    if entry is None:
+        return None
+    if entry[0] <= time.time():
+        del _token_cache[digest]
+        return None
+    _token_cache.move_to_end(digest)
+    return entry[1]
+
+def _cache_user(digest: bytes, user_id: str, payload: dict):
+    expires_at = time.time() + _TOKEN_CACHE_TTL
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        expires_at = min(expires_at, exp)
+    _token_cache[digest] = (expires_at, user_id)
+    _token_cache.move_to_end(digest)
+    if len(_token_cache) > _TOKEN_CACHE_MAXSIZE:
+        _token_cache.popitem(last=False)
+
 # JWKS URL no longer needed
 # JWKS_URL = f"{SUPABASE_URL}/auth/v1/jwks" 
 
@@ -46,15 +115,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    digest = _token_digest(token)
+    cached_user_id = _get_cached_user(digest)
+    if cached_user_id is not None:
+        return cached_user_id
+
     try:
         # Verify the token signature and claims using the JWT Secret
-        payload = jwt.decode(
-            token,
-            SUPABASE_JWT_SECRET,
-            algorithms=["HS256"], 
-            audience="authenticated" # Specify expected audience for Supabase JWTs
-            # issuer=f"{SUPABASE_URL}/auth/v1" # Optionally validate issuer
-        )
+        payload = decode_supabase_token(token)
         
         user_id: str = payload.get("sub")
         if user_id is None:
@@ -62,10 +130,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             raise credentials_exception
             
         logging.info(f"Successfully validated token for user_id: {user_id} using JWT Secret.")
+        _cache_user(digest, user_id, payload)
         return user_id # Return the user ID (subject)
 
     except JWTError as e:
         logging.error(f"JWT Error: {e}")
+        _token_cache.pop(digest, None)
         raise credentials_exception
     except Exception as e:
         logging.error(f"Unexpected error during token validation: {e}")
@@ -1,45 +1,113 @@
+import numpy as np
 import pandas as pd
 import logging
-from typing import Dict, Any, Optional, List
+import functools
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Callable, Tuple
 import uuid
-import random # For dummy results
+from binance.helpers import convert_ts_str, interval_to_milliseconds
 
 # Import utility functions
-from .indicators import calculate_rsi, calculate_macd # etc.
+from .indicators import calculate_rsi, calculate_macd, calculate_momentum_signals # etc.
 from .binance_client import get_historical_klines_df # To fetch data
 from .grid import calculate_grid_levels # For grid bot logic
+from ._backtest_kernels import _momentum_sim, _grid_sim, _equity_stats, SIDE_BUY
 
 logger = logging.getLogger(__name__)
 
 # --- Backtesting Configuration ---
 INITIAL_CAPITAL = 10000.0 # Example starting capital in quote currency
 COMMISSION_RATE = 0.001 # Example trading commission (0.1%)
+MS_PER_YEAR = 365 * 24 * 60 * 60 * 1000 # Crypto markets trade every day
 
 # --- Backtesting Result Structure ---
 # TODO: Define a more structured result class or TypedDict
 BacktestResult = Dict[str, Any] 
 
-# --- Helper Function for Grid Backtest ---
-# Define it outside run_backtest so it's accessible within the grid logic block
-def _find_next_grid_level(current_level: float, direction: str, grid_levels: List[float]) -> Optional[float]:
-    """Finds the next grid level above ('up') or below ('down') the current level."""
+# --- Indicator Cache ---
+# Parameter sweeps rerun the same klines with the same indicator settings; keep recent indicator arrays
+# (read-only, shared) keyed by a fingerprint of the data plus the indicator and its parameters.
+# Every candle but the last is closed and immutable, so the fingerprint only needs the range, length
+# and last close. LRU-bounded to _INDICATOR_CACHE_MAXSIZE entries.
+# Indicators are computed in float64 (the EMA recurrences accumulate rounding error) but stored as
+# float32: they are only compared against thresholds and each other, and it halves cache memory.
+_INDICATOR_CACHE_MAXSIZE = 32
+_indicator_cache: "OrderedDict[tuple, Tuple[np.ndarray, ...]]" = OrderedDict()
+
+def _data_fingerprint(symbol: str, interval: str, index: pd.DatetimeIndex, close: np.ndarray) -> tuple:
+    return (symbol, interval, len(close), index[0].value, index[-1].value, float(close[-1]))
+
+def _cached_indicator(key: tuple, compute: Callable[[], Tuple[np.ndarray, ...]]) -> Tuple[np.ndarray, ...]:
+    arrays = _indicator_cache.get(key)
+    if arrays is not None:
+        _indicator_cache.move_to_end(key)
+        return arrays
+    arrays = tuple(np.asarray(array, dtype=np.float32) for array in compute())
+    for array in arrays:
+        array.flags.writeable = False
+    _indicator_cache[key] = arrays
+    if len(_indicator_cache) > _INDICATOR_CACHE_MAXSIZE:
+        _indicator_cache.popitem(last=False)
+    return arrays
+
+def _trades_log(index: pd.DatetimeIndex, bars: np.ndarray, sides: np.ndarray, prices: np.ndarray, quantities: np.ndarray) -> List[Dict[str, Any]]:
+    """Builds the trades list from per-trade arrays, formatting all timestamps in one vectorized pass."""
+    timestamps = index[bars].strftime('%Y-%m-%dT%H:%M:%S')
+    return [
+        {"timestamp": ts, "side": "BUY" if side == SIDE_BUY else "SELL", "price": price, "quantity": qty}
+        for ts, side, price, qty in zip(timestamps, sides.tolist(), prices.tolist(), quantities.tolist())
+    ]
+
+# --- Result Cache ---
+# Optimizer sweeps re-submit identical (config, range) pairs; finished results are kept in an LRU keyed by
+# a hash of what the simulation actually reads (bot type, symbol, params) plus the requested range.
+# Only ranges whose last candle has closed are cached (a range ending now is still changing), and
+# the resolved range is part of the key so relative dates like "30 days ago" never hit a stale entry.
+# Cached results are shared between callers and must not be mutated.
+_BACKTEST_CACHE_MAXSIZE = 128
+_backtest_cache: "OrderedDict[str, BacktestResult]" = OrderedDict()
+
+def _candle_interval(bot_type: str, config_params: Dict[str, Any]) -> str:
+    default = '15m' if bot_type == 'grid' else '1h' # Grid might use smaller interval
+    return config_params.get('candle_interval', default)
+
+def _backtest_cache_key(bot_config: Dict[str, Any], start_date: str, end_date: str) -> Optional[str]:
+    """Returns the cache key for a run, or None if its result must not be cached."""
+    bot_type = bot_config.get('bot_type')
+    config_params = bot_config.get('config_params', {})
     try:
-        # Ensure levels are sorted (should be from calculate_grid_levels)
-        sorted_levels = sorted(grid_levels) 
-        current_index = sorted_levels.index(current_level)
-        if direction == 'up' and current_index < len(sorted_levels) - 1:
-            return sorted_levels[current_index + 1]
-        elif direction == 'down' and current_index > 0:
-            return sorted_levels[current_index - 1]
-        else:
-            return None 
-    except ValueError:
-        logger.warning(f"Level {current_level} not found in calculated grid levels: {grid_levels}")
+        start_ms, end_ms = convert_ts_str(start_date), convert_ts_str(end_date)
+        interval_ms = interval_to_milliseconds(_candle_interval(bot_type, config_params))
+    except Exception: # Unparseable dates; let run_backtest report the failure
         return None
-    except IndexError:
-         logger.warning(f"Index out of bounds while finding next grid level for {current_level}.")
-         return None
+    if end_ms is None or interval_ms is None or end_ms + interval_ms > int(time.time() * 1000):
+        return None # The candle opening at end_date hasn't closed yet
+    payload = {
+        'bot_type': bot_type, 'symbol': bot_config.get('symbol'), 'config_params': config_params,
+        'start': start_date, 'end': end_date, 'start_ms': start_ms, 'end_ms': end_ms,
+    }
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+def _memoized_backtest(run: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(run)
+    async def wrapper(bot_config: Dict[str, Any], start_date: str, end_date: str) -> Optional[BacktestResult]:
+        key = _backtest_cache_key(bot_config, start_date, end_date)
+        if key is not None and key in _backtest_cache:
+            _backtest_cache.move_to_end(key)
+            logger.info(f"Serving backtest for {bot_config.get('symbol')} from {start_date} to {end_date} from cache")
+            return _backtest_cache[key]
+        results = await run(bot_config, start_date, end_date)
+        if key is not None and results is not None: # Failures may be transient; don't cache them
+            _backtest_cache[key] = results
+            if len(_backtest_cache) > _BACKTEST_CACHE_MAXSIZE:
+                _backtest_cache.popitem(last=False)
+        return results
+    return wrapper
 
+@_memoized_backtest
 async def run_backtest(
     bot_config: Dict[str, Any], 
     start_date: str, 
@@ -59,9 +127,7 @@ async def run_backtest(
     logger.info(f"Starting backtest for {bot_type} bot on {symbol} from {start_date} to {end_date}")
 
     # 1. Fetch Historical Data
-    interval = config_params.get('candle_interval', '1h') # Default interval
-    if bot_type == 'grid':
-         interval = config_params.get('candle_interval', '15m') # Grid might use smaller interval
+    interval = _candle_interval(bot_type, config_params)
          
     try:
         historical_data = await get_historical_klines_df(symbol, interval, start_date, end_date)
@@ -78,13 +144,12 @@ async def run_backtest(
     # --- Initialize Portfolio ---
     cash = INITIAL_CAPITAL
     position_size = 0.0 # Amount of base asset held
-    equity = [INITIAL_CAPITAL] # Start equity curve
+    equity: np.ndarray = np.empty(0, dtype=np.float64) # Portfolio value at each bar, filled by the branch below
     trades_log: List[Dict[str, Any]] = []
     
     # --- Run Simulation based on Bot Type ---
     if bot_type == 'momentum':
         logger.info("Running Momentum backtest simulation...")
-        last_signal = None 
         rsi_period = int(config_params.get('rsi_period', 14))
         rsi_oversold = float(config_params.get('rsi_oversold', 30))
         rsi_overbought = float(config_params.get('rsi_overbought', 70))
@@ -98,38 +163,32 @@ async def run_backtest(
              return None 
 
         try:
-            historical_data['rsi'] = calculate_rsi(historical_data['close'], rsi_period)
-            macd_df = calculate_macd(historical_data['close'], macd_fast, macd_slow, macd_signal)
-            historical_data = pd.concat([historical_data, macd_df], axis=1)
+            # Indicators stay as arrays, trimmed with the same slice as the frame; no columns are added to it
+            close = historical_data['close'].to_numpy(dtype=np.float64)
+            data_key = _data_fingerprint(symbol, interval, historical_data.index, close)
+            (rsi,) = _cached_indicator(data_key + ('rsi', rsi_period), lambda: (calculate_rsi(close, rsi_period),))
+            macd_line, signal_line = _cached_indicator(
+                data_key + ('macd', macd_fast, macd_slow, macd_signal),
+                lambda: calculate_macd(close, macd_fast, macd_slow, macd_signal)[:2]
+            )
             first_valid_index = max(rsi_period, macd_slow + macd_signal) 
             historical_data = historical_data.iloc[first_valid_index:]
             if historical_data.empty: raise ValueError("Not enough data after indicator calculation.")
+            close = close[first_valid_index:]
+            # Signal masks for every bar at once; the loop below only reads them
+            buy_signals, sell_signals = calculate_momentum_signals(
+                rsi[first_valid_index:], macd_line[first_valid_index:], signal_line[first_valid_index:],
+                rsi_oversold, rsi_overbought
+            )
         except Exception as e:
             logger.error(f"Error calculating indicators for Momentum backtest: {e}", exc_info=True)
             return None
 
-        for i in range(len(historical_data)):
-            current_time = historical_data.index[i]
-            current_price = historical_data['close'].iloc[i]
-            current_rsi = historical_data['rsi'].iloc[i]
-            current_macd = historical_data['MACD'].iloc[i]
-            current_signal = historical_data['Signal'].iloc[i]
-            
-            current_value = cash + (position_size * current_price)
-            if i > 0: equity.append(current_value) 
-
-            buy_signal = current_rsi > rsi_oversold and current_macd > current_signal
-            sell_signal = current_rsi < rsi_overbought or current_macd < current_signal
-
-            if buy_signal and position_size == 0 and last_signal != 'BUY': 
-                cost = current_price * trade_quantity_base * (1 + COMMISSION_RATE)
-                if cash >= cost:
-                    cash -= cost; position_size += trade_quantity_base; last_signal = 'BUY'
-                    trades_log.append({"timestamp": current_time.isoformat(), "side": "BUY", "price": current_price, "quantity": trade_quantity_base})
-            elif sell_signal and position_size > 0 and last_signal != 'SELL': 
-                proceeds = current_price * position_size * (1 - COMMISSION_RATE)
-                cash += proceeds; sold_quantity = position_size; position_size = 0.0; last_signal = 'SELL'
-                trades_log.append({"timestamp": current_time.isoformat(), "side": "SELL", "price": current_price, "quantity": sold_quantity})
+        # One compiled pass over the bars, valuing the portfolio as it goes
+        equity, trade_idx, trade_side, trade_price, trade_qty = _momentum_sim(
+            close, buy_signals, sell_signals, trade_quantity_base, INITIAL_CAPITAL, COMMISSION_RATE
+        )
+        trades_log = _trades_log(historical_data.index, trade_idx, trade_side, trade_price, trade_qty)
                 
     elif bot_type == 'grid':
          logger.info("Running Grid backtest simulation (simplified)...")
@@ -143,141 +202,88 @@ async def run_backtest(
              logger.error("Invalid parameters for Grid backtest.")
              return None
              
-         grid_levels = calculate_grid_levels(lower_bound, upper_bound, num_grids, grid_mode)
+         levels = calculate_grid_levels(lower_bound, upper_bound, num_grids, grid_mode, as_array=True)
          
          initial_price = historical_data['open'].iloc[0]
-         buy_levels_below = [level for level in grid_levels if level < initial_price]
-         
-         if not buy_levels_below:
-              pending_buy_orders = {}
-         else:
-             value_per_order = investment_amount / len(buy_levels_below)
-             pending_buy_orders = {level: value_per_order / level for level in buy_levels_below} 
+         below = levels < initial_price
+         num_buy_levels = int(below.sum())
+         # Starting buy quantity per level; 0 marks a level with no pending order
+         initial_buy_qty = np.where(below, (investment_amount / num_buy_levels) / levels, 0.0) if num_buy_levels else np.zeros_like(levels)
              
-         logger.info(f"Initial pending buy orders: {len(pending_buy_orders)}")
+         logger.info(f"Initial pending buy orders: {num_buy_levels}")
          # TODO: Simulate initial sell orders 
-         pending_sell_orders = {} # Placeholder for sells placed after buys fill
-
-         for i in range(len(historical_data)):
-             current_time = historical_data.index[i]
-             low_price = historical_data['low'].iloc[i]
-             high_price = historical_data['high'].iloc[i] # Needed for sell fills
-             close_price = historical_data['close'].iloc[i] 
-
-             current_value = cash + (position_size * close_price)
-             if i > 0: equity.append(current_value)
 
-             # Check for buy fills 
-             filled_buys = []
-             for level, quantity in pending_buy_orders.items():
-                 if low_price <= level:
-                     cost = level * quantity * (1 + COMMISSION_RATE)
-                     if cash >= cost:
-                         cash -= cost; position_size += quantity
-                         trades_log.append({"timestamp": current_time.isoformat(), "side": "BUY", "price": level, "quantity": quantity})
-                         filled_buys.append(level)
-                         
-                         # Simulate placing corresponding sell order
-                         sell_level = _find_next_grid_level(level, 'up', grid_levels) 
-                         if sell_level:
-                              pending_sell_orders[sell_level] = quantity # Track pending sell
-                              logger.debug(f"Simulating placement of SELL @ {sell_level:.2f} for filled BUY @ {level:.2f}")
-                         else:
-                              logger.warning(f"Grid BUY filled @ {level:.2f}, but no higher level to place SELL.")
-                              
-             for level in filled_buys: pending_buy_orders.pop(level, None)
-                 
-             # Check for sell fills (from orders placed after buys)
-             filled_sells = []
-             for level, quantity in pending_sell_orders.items():
-                  if high_price >= level:
-                       proceeds = level * quantity * (1 - COMMISSION_RATE)
-                       # Ensure we have enough position to sell (can happen with partial fills in reality)
-                       if position_size >= quantity: 
-                            cash += proceeds; position_size -= quantity
-                            trades_log.append({"timestamp": current_time.isoformat(), "side": "SELL", "price": level, "quantity": quantity})
-                            filled_sells.append(level)
-                            logger.debug(f"{current_time} - Grid SELL filled @ {level:.2f}, Qty: {quantity:.4f}, Cash: {cash:.2f}")
-                            
-                            # Simulate placing corresponding buy order
-                            buy_level = _find_next_grid_level(level, 'down', grid_levels)
-                            if buy_level:
-                                 pending_buy_orders[buy_level] = quantity # Track pending buy
-                                 logger.debug(f"Simulating placement of BUY @ {buy_level:.2f} for filled SELL @ {level:.2f}")
-                            else:
-                                 logger.warning(f"Grid SELL filled @ {level:.2f}, but no lower level to place BUY.")
-                       else:
-                            logger.warning(f"Sell signal @ {level} but insufficient position ({position_size} < {quantity})")
-
-
-             for level in filled_sells: pending_sell_orders.pop(level, None)
+         close = historical_data['close'].to_numpy(dtype=np.float64)
+         equity, trade_bar, trade_level, trade_side, trade_qty = _grid_sim(
+             historical_data['low'].to_numpy(dtype=np.float64), historical_data['high'].to_numpy(dtype=np.float64), close,
+             levels, initial_buy_qty, INITIAL_CAPITAL, COMMISSION_RATE
+         )
+         trades_log = _trades_log(historical_data.index, trade_bar, trade_side, levels[trade_level], trade_qty)
 
     elif bot_type == 'dca':
          logger.info("Running DCA backtest simulation...")
          purchase_amount_quote = float(config_params.get('purchase_amount_quote', 0))
          purchase_interval_seconds = int(config_params.get('purchase_interval_seconds', 86400))
-         last_purchase_timestamp = None
 
          if purchase_amount_quote <= 0 or purchase_interval_seconds <= 0:
               logger.error("Invalid parameters for DCA backtest.")
               return None
 
-         for i in range(len(historical_data)):
-             current_time = historical_data.index[i]
-             current_price = historical_data['close'].iloc[i]
-             
-             current_value = cash + (position_size * current_price)
-             if i > 0: equity.append(current_value)
+         # Purchases only happen on a handful of bars: jump from each one straight to the first bar at least
+         # one interval later (cash never increases, so once a purchase is unaffordable none follow)
+         close = historical_data['close'].to_numpy(dtype=np.float64)
+         open_times = historical_data.index.values.astype('datetime64[ns]').view(np.int64)
+         interval_ns = purchase_interval_seconds * 1_000_000_000
+         cost = purchase_amount_quote * (1 + COMMISSION_RATE)
+         purchase_bars: List[int] = []
+         purchase_quantities: List[float] = []
+         cash_after = [cash] # cash/position after 0, 1, 2, ... purchases
+         position_after = [position_size]
+         i = 0
+         while i < len(close) and cash >= cost:
+             quantity_to_buy = purchase_amount_quote / close[i]
+             cash -= cost; position_size += quantity_to_buy
+             purchase_bars.append(i); purchase_quantities.append(quantity_to_buy)
+             cash_after.append(cash); position_after.append(position_size)
+             i = int(np.searchsorted(open_times, open_times[i] + interval_ns, side='left'))
 
-             make_purchase = False
-             if last_purchase_timestamp is None: 
-                 make_purchase = True
-             else:
-                 if isinstance(last_purchase_timestamp, pd.Timestamp):
-                      time_since_last = (current_time - last_purchase_timestamp).total_seconds()
-                      if time_since_last >= purchase_interval_seconds: make_purchase = True
-                 else: 
-                      logger.error("last_purchase_timestamp is not valid."); make_purchase = True 
-             
-             if make_purchase:
-                 quantity_to_buy = purchase_amount_quote / current_price 
-                 cost = purchase_amount_quote * (1 + COMMISSION_RATE) 
-                 if cash >= cost:
-                     cash -= cost; position_size += quantity_to_buy
-                     last_purchase_timestamp = current_time
-                     trades_log.append({"timestamp": current_time.isoformat(), "side": "BUY", "price": current_price, "quantity": quantity_to_buy})
+         bars = np.array(purchase_bars, dtype=np.int64)
+         # Holdings valued at each bar are those after the purchases made on earlier bars
+         purchases_before = np.searchsorted(bars, np.arange(len(close)), side='left')
+         equity = np.array(cash_after)[purchases_before] + np.array(position_after)[purchases_before] * close
+         trades_log = _trades_log(
+             historical_data.index, bars, np.full(len(bars), SIDE_BUY, dtype=np.int8),
+             close[bars], np.array(purchase_quantities, dtype=np.float64)
+         )
 
     else:
         logger.error(f"Unsupported bot_type '{bot_type}' for backtesting.")
         return None
 
     # --- Final Calculations & Result Formatting ---
-    if not equity: 
+    if equity.size == 0: 
          logger.warning("Equity curve is empty.")
          return None 
          
-    final_portfolio_value = equity[-1]
+    final_portfolio_value = float(equity[-1])
     total_pnl = final_portfolio_value - INITIAL_CAPITAL
     total_pnl_percent = (total_pnl / INITIAL_CAPITAL) * 100 if INITIAL_CAPITAL else 0
     total_trades = len(trades_log)
     
-    wins = sum(1 for i in range(1, len(trades_log)) if trades_log[i]['side'] == 'SELL' and trades_log[i-1]['side'] == 'BUY' and trades_log[i]['price'] > trades_log[i-1]['price'])
-    losses = sum(1 for i in range(1, len(trades_log)) if trades_log[i]['side'] == 'SELL' and trades_log[i-1]['side'] == 'BUY' and trades_log[i]['price'] <= trades_log[i-1]['price'])
+    # A round trip is a SELL immediately following a BUY; it wins if it sold higher than it bought
+    is_sell = np.array([trade['side'] == 'SELL' for trade in trades_log], dtype=bool)
+    trade_prices = np.array([trade['price'] for trade in trades_log], dtype=np.float64)
+    round_trips = is_sell[1:] & ~is_sell[:-1]
+    wins = int(np.count_nonzero(round_trips & (trade_prices[1:] > trade_prices[:-1])))
+    losses = int(np.count_nonzero(round_trips & (trade_prices[1:] <= trade_prices[:-1])))
     win_rate = (wins / (wins + losses)) * 100 if (wins + losses) > 0 else 0.0
 
-    max_drawdown = 0.0
-    peak_equity = -float('inf') 
-    equity_series = pd.Series(equity) 
-    
-    for value in equity_series:
-        if value > peak_equity: peak_equity = value
-        drawdown = (peak_equity - value) / peak_equity if peak_equity > 0 else 0
-        if drawdown > max_drawdown: max_drawdown = drawdown
-            
-    sharpe_ratio = random.uniform(0.1, 1.0) # Placeholder
+    # Max drawdown and Sharpe ratio share a single pass over the equity curve
+    max_drawdown, sharpe_ratio = _equity_stats(equity, MS_PER_YEAR / interval_to_milliseconds(interval))
+    max_drawdown, sharpe_ratio = float(max_drawdown), float(sharpe_ratio)
     
     equity_curve_timestamps = historical_data.index.strftime('%Y-%m-%dT%H:%M:%SZ').tolist()
-    equity_curve_values = equity
+    equity_curve_values = equity.tolist()
     
     results: BacktestResult = {
         "start_date": start_date, "end_date": end_date, "symbol": symbol,
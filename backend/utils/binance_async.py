@@ -0,0 +1,99 @@
+import os
+import hmac
+import hashlib
+import time
+import logging
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+
+import httpx
+from binance.exceptions import BinanceAPIException
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables from .env file located in the backend directory
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+BINANCE_API_URL = os.getenv("BINANCE_API_URL", "https://testnet.binance.vision/api")
+
+# --- Shared HTTP client (one connection pool / TLS session for all bots) ---
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Lazily creates the process-wide httpx client used for signed Binance REST calls."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=BINANCE_API_URL,
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=10.0,
+        )
+    return _http_client
+
+async def close_http_client():
+    """Closes the shared httpx client, if one was created."""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+# --- Signing ---
+
+def _format_param(value: Any) -> str:
+    # Avoid scientific notation for small quantities/prices (e.g. 1e-05)
+    if isinstance(value, float):
+        return f"{value:.8f}".rstrip('0').rstrip('.')
+    return str(value)
+
+def _sign(params: Dict[str, Any], api_secret: str) -> Dict[str, str]:
+    """Returns params with timestamp and HMAC-SHA256 signature appended, in signing order."""
+    signed = {k: _format_param(v) for k, v in params.items() if v is not None}
+    signed['timestamp'] = str(int(time.time() * 1000))
+    signed['signature'] = hmac.new(api_secret.encode(), urlencode(signed).encode(), hashlib.sha256).hexdigest()
+    return signed
+
+async def _signed_request(method: str, path: str, params: Dict[str, Any]) -> Any:
+    """
+    Sends a signed request and returns the decoded JSON body.
+    Raises BinanceAPIException on non-2xx responses, matching python-binance's error type.
+    """
+    api_key = os.getenv("BINANCE_TESTNET_API_KEY")
+    api_secret = os.getenv("BINANCE_TESTNET_API_SECRET")
+    if not api_key or not api_secret:
+        raise RuntimeError("Binance API Key or Secret not found in environment variables.")
+
+    response = await get_http_client().request(
+        method, path, params=_sign(params, api_secret), headers={'X-MBX-APIKEY': api_key}
+    )
+    if not response.is_success:
+        raise BinanceAPIException(response, response.status_code, response.text)
+    return response.json()
+
+async def signed_get(path: str, params: Dict[str, Any]) -> Any:
+    return await _signed_request('GET', path, params)
+
+async def signed_post(path: str, params: Dict[str, Any]) -> Any:
+    return await _signed_request('POST', path, params)
+
+async def signed_delete(path: str, params: Dict[str, Any]) -> Any:
+    return await _signed_request('DELETE', path, params)
+
+# --- Spot order endpoints (same names/arguments as python-binance's Client) ---
+
+async def create_order(**params) -> Dict:
+    return await signed_post('/v3/order', params)
+
+async def get_order(symbol: str, orderId: str) -> Dict:
+    return await signed_get('/v3/order', {'symbol': symbol, 'orderId': orderId})
+
+async def get_open_orders(symbol: str) -> List[Dict]:
+    return await signed_get('/v3/openOrders', {'symbol': symbol})
+
+async def cancel_order(symbol: str, orderId: str) -> Dict:
+    return await signed_delete('/v3/order', {'symbol': symbol, 'orderId': orderId})
+
+async def cancel_open_orders(symbol: str) -> List[Dict]:
+    return await signed_delete('/v3/openOrders', {'symbol': symbol})
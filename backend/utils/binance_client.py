@@ -1,67 +1,128 @@
 import os
 from binance.client import Client
+from binance import ThreadedWebsocketManager
 from binance.exceptions import BinanceAPIException, BinanceRequestException
 from dotenv import load_dotenv
 import logging
 import asyncio
+import functools
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict # Import Dict
+import numpy as np
 import pandas as pd # Import pandas at the top level
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from binance.helpers import convert_ts_str, interval_to_milliseconds
+from . import binance_async # Native async signed REST calls (order endpoints)
+from .kline_disk_cache import parquet_cached
 
 # Load environment variables from .env file located in the backend directory
 # Adjust the path according to the script's location relative to the .env file
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path=dotenv_path)
 
-# --- Global variable to hold the client instance ---
-_binance_client_instance: Optional[Client] = None
-_client_lock = asyncio.Lock() # Lock for thread-safe initialization
+# --- Global client instance ---
+# Resolves to the shared Client once initialized (None while unset or after a failed attempt)
+_client_future: Optional[asyncio.Future] = None
+
+# --- Rate Limiting ---
+class AsyncRateLimiter:
+    """
+    Leaky-bucket rate limiter usable as an async context manager.
+    Allows at most `max_rate` acquisitions per `time_period` seconds; callers
+    over the limit wait until enough capacity has drained instead of hitting 429s.
+    """
+    def __init__(self, max_rate: float, time_period: float = 60.0):
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self._rate_per_sec = max_rate / time_period
+        self._level = 0.0
+        self._last_check = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _leak(self):
+        now = time.monotonic()
+        elapsed = now - self._last_check
+        self._level = max(0.0, self._level - elapsed * self._rate_per_sec)
+        self._last_check = now
+
+    async def acquire(self, amount: float = 1.0):
+        # More than a full bucket could never fit, and would hold the lock (and every other caller) forever
+        amount = min(amount, self.max_rate)
+        async with self._lock:
+            while True:
+                self._leak()
+                if self._level + amount <= self.max_rate:
+                    self._level += amount
+                    return
+                await asyncio.sleep((self._level + amount - self.max_rate) / self._rate_per_sec)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return None
+
+# Binance Spot limits: request weight per minute for /api/v3/*, and order placement rate
+REQUEST_LIMITER = AsyncRateLimiter(1200, 60)
+ORDER_LIMITER = AsyncRateLimiter(50, 10)
 
 async def get_binance_client() -> Optional[Client]:
     """
     Lazily initializes and returns the Binance client instance.
-    Ensures thread-safe initialization.
+    The first caller runs the initialization; concurrent callers await the same future, and once it has
+    resolved every call returns the client straight from it. A failed initialization is retried on the next call.
     """
-    global _binance_client_instance
-    
-    # Fast path: Check if already initialized without lock
-    if _binance_client_instance:
-        return _binance_client_instance
+    global _client_future
 
-    async with _client_lock:
-        # Double-check after acquiring lock
-        if _binance_client_instance:
-            return _binance_client_instance
+    # Fast path: already initialized (or being initialized by another caller)
+    future = _client_future
+    if future is not None:
+        if future.done():
+            return future.result()
+        # Shield so a cancelled waiter doesn't cancel the initialization others are waiting on
+        return await asyncio.shield(future)
 
-        api_key = os.getenv("BINANCE_TESTNET_API_KEY")
-        api_secret = os.getenv("BINANCE_TESTNET_API_SECRET")
+    future = _client_future = asyncio.get_running_loop().create_future()
+    client = None
+    try:
+        client = await _create_binance_client()
+    finally:
+        if client is None and _client_future is future:
+            _client_future = None
+        if not future.done():
+            future.set_result(client)
+    return client
+
+async def _create_binance_client() -> Optional[Client]:
+    api_key = os.getenv("BINANCE_TESTNET_API_KEY")
+    api_secret = os.getenv("BINANCE_TESTNET_API_SECRET")
 
-        if not api_key or not api_secret:
-            logging.error("Binance API Key or Secret not found in environment variables.")
-            return None
+    if not api_key or not api_secret:
+        logging.error("Binance API Key or Secret not found in environment variables.")
+        return None
+    
+    logging.info("Initializing Binance client...")
+    try:
+        # Client() pings the exchange synchronously; keep that off the event loop
+        loop = asyncio.get_running_loop()
+        client = await loop.run_in_executor(None, functools.partial(Client, api_key, api_secret, testnet=True))
+        # Test connection (optional, can be deferred further)
+        # account_status = await loop.run_in_executor(None, client.get_account_status)
+        # logging.info(f"Successfully connected to Binance Testnet. Account Status: {account_status.get('data')}")
+        logging.info("Binance client initialized successfully.")
+        return client
         
-        logging.info("Initializing Binance client...")
-        try:
-            client = Client(api_key, api_secret, testnet=True)
-            # Test connection (optional, can be deferred further)
-            # loop = asyncio.get_event_loop()
-            # account_status = await loop.run_in_executor(None, client.get_account_status)
-            # logging.info(f"Successfully connected to Binance Testnet. Account Status: {account_status.get('data')}")
-            _binance_client_instance = client
-            logging.info("Binance client initialized successfully.")
-            return _binance_client_instance
-            
-        except BinanceAPIException as e:
-            logging.error(f"Binance API Exception during initialization: {e.status_code} - {e.message}")
-            return None
-        except BinanceRequestException as e:
-            logging.error(f"Binance Request Exception during initialization: {e.status_code} - {e.message}")
-            return None
-        except Exception as e:
-            logging.error(f"An unexpected error occurred during Binance client initialization: {e}", exc_info=True)
-            return None
+    except BinanceAPIException as e:
+        logging.error(f"Binance API Exception during initialization: {e.status_code} - {e.message}")
+        return None
+    except BinanceRequestException as e:
+        logging.error(f"Binance Request Exception during initialization: {e.status_code} - {e.message}")
+        return None
+    except Exception as e:
+        logging.error(f"An unexpected error occurred during Binance client initialization: {e}", exc_info=True)
+        return None
 
 # --- Client Functions ---
 
@@ -76,7 +137,8 @@ async def get_current_price(symbol: str):
         loop = asyncio.get_event_loop()
         # Pass symbol as a keyword argument using a lambda or functools.partial
         # Using lambda for simplicity here:
-        avg_price = await loop.run_in_executor(None, lambda: client.get_avg_price(symbol=symbol))
+        async with REQUEST_LIMITER:
+            avg_price = await loop.run_in_executor(None, lambda: client.get_avg_price(symbol=symbol))
         logging.info(f"Current average price for {symbol}: {avg_price['price']}")
         return float(avg_price['price'])
     except BinanceAPIException as e:
@@ -99,7 +161,77 @@ async def get_historical_klines(symbol: str, interval: str, start_str: str, end_
         import asyncio
         loop = asyncio.get_event_loop()
         logging.info(f"Fetching klines for {symbol}, interval {interval}, start {start_str}, end {end_str}")
-        klines = await loop.run_in_executor(None, client.get_historical_klines, symbol, interval, start_str, end_str)
+        async with REQUEST_LIMITER:
+            klines = await loop.run_in_executor(None, client.get_historical_klines, symbol, interval, start_str, end_str)
+        logging.info(f"Fetched {len(klines)} klines for {symbol}")
+        return klines
+    except BinanceAPIException as e:
+        logging.error(f"Binance API Error fetching klines for {symbol}: {e}")
+        return None
+    except Exception as e:
+        logging.error(f"Unexpected error fetching klines for {symbol}: {e}", exc_info=True)
+        return None
+
+# --- Parallel Historical Klines ---
+# python-binance pages through a range 1000 klines at a time, serially (sleeping between pages);
+# long ranges are split into time slices fetched on a bounded pool instead
+KLINE_FIELDS = 12 # Values per kline row returned by the REST API
+MAX_KLINES_PER_REQUEST = 1000 # Binance's maximum `limit` for a single klines request
+KLINES_REQUEST_WEIGHT = 2 # Request weight of one /api/v3/klines call at that limit
+KLINE_FETCH_WORKERS = 8
+_kline_executor = ThreadPoolExecutor(max_workers=KLINE_FETCH_WORKERS, thread_name_prefix="klines")
+
+async def get_historical_klines_parallel(symbol: str, interval: str, start_str: str, end_str: str = None, workers: int = KLINE_FETCH_WORKERS):
+    """
+    Same result as get_historical_klines, but splits [start, end] into up to `workers` equal time
+    slices and fetches them concurrently. Ranges that fit in one request go through the serial path.
+    """
+    client = await get_binance_client() # Get or initialize client
+    if not client:
+        logging.error("Binance client could not be initialized.")
+        return None
+    try:
+        start_ms = convert_ts_str(start_str)
+        end_ms = convert_ts_str(end_str) if end_str else int(time.time() * 1000)
+        interval_ms = interval_to_milliseconds(interval)
+        total_klines = (end_ms - start_ms) // interval_ms + 1
+        num_slices = min(workers, math.ceil(total_klines / MAX_KLINES_PER_REQUEST))
+        if num_slices <= 1:
+            return await get_historical_klines(symbol, interval, start_str, end_str)
+
+        # Slices are disjoint, inclusive ms ranges, so every kline open time lands in exactly one of them
+        slice_ms = math.ceil(total_klines / num_slices) * interval_ms
+        slices = [(s, min(s + slice_ms - 1, end_ms)) for s in range(start_ms, end_ms + 1, slice_ms)]
+        loop = asyncio.get_event_loop()
+
+        async def fetch_slice(slice_start: int, slice_end: int):
+            # Paged here rather than via client.get_historical_klines so each request is charged to the limiter
+            # as it is made, however long the slice
+            slice_klines = []
+            page_start = slice_start
+            while page_start <= slice_end:
+                await REQUEST_LIMITER.acquire(KLINES_REQUEST_WEIGHT)
+                page = await loop.run_in_executor(_kline_executor, functools.partial(
+                    client.get_klines, symbol=symbol, interval=interval,
+                    startTime=page_start, endTime=slice_end, limit=MAX_KLINES_PER_REQUEST
+                ))
+                slice_klines.extend(page)
+                if len(page) < MAX_KLINES_PER_REQUEST:
+                    break
+                page_start = page[-1][0] + interval_ms
+            return slice_klines
+
+        logging.info(f"Fetching klines for {symbol}, interval {interval}, start {start_str}, end {end_str} in {len(slices)} parallel slices")
+        results = await asyncio.gather(*(fetch_slice(s, e) for s, e in slices))
+
+        # Concatenate in slice order, dropping any kline already seen (defensive; slices don't overlap)
+        klines = []
+        last_open_time = -1
+        for chunk in results:
+            for kline in chunk:
+                if kline[0] > last_open_time:
+                    klines.append(kline)
+                    last_open_time = kline[0]
         logging.info(f"Fetched {len(klines)} klines for {symbol}")
         return klines
     except BinanceAPIException as e:
@@ -109,6 +241,29 @@ async def get_historical_klines(symbol: str, interval: str, start_str: str, end_
         logging.error(f"Unexpected error fetching klines for {symbol}: {e}", exc_info=True)
         return None
 
+async def get_recent_klines(symbol: str, interval: str, limit: int = 2):
+    """
+    Fetches the most recent `limit` Klines for a symbol in a single request.
+    The last kline is the still-open candle; earlier ones are closed.
+    """
+    client = await get_binance_client() # Get or initialize client
+    if not client:
+        logging.error("Binance client could not be initialized.")
+        return None
+    try:
+        loop = asyncio.get_event_loop()
+        logging.debug(f"Fetching last {limit} klines for {symbol}, interval {interval}")
+        async with REQUEST_LIMITER:
+            klines = await loop.run_in_executor(None, functools.partial(client.get_klines, symbol=symbol, interval=interval, limit=limit))
+        return klines
+    except BinanceAPIException as e:
+        logging.error(f"Binance API Error fetching recent klines for {symbol}: {e}")
+        return None
+    except Exception as e:
+        logging.error(f"Unexpected error fetching recent klines for {symbol}: {e}", exc_info=True)
+        return None
+
+@parquet_cached # Repeated backtests over the same range read closed candles from disk
 async def get_historical_klines_df(symbol: str, interval: str, start_str: str, end_str: str = None) -> Optional[pd.DataFrame]:
     """
     Fetches historical Klines and returns them as a pandas DataFrame.
@@ -120,52 +275,40 @@ async def get_historical_klines_df(symbol: str, interval: str, start_str: str, e
         end_str (str, optional): End date string.
 
     Returns:
-        Optional[pd.DataFrame]: DataFrame with columns like 'timestamp', 'open', 'high', 'low', 'close', 'volume', 
-                                or None if an error occurs. Timestamp is set as the index.
+        Optional[pd.DataFrame]: DataFrame with float64 'open', 'high', 'low', 'close', 'volume' columns indexed
+                                by candle open time ('timestamp'), or None if an error occurs.
     """
     # No need to import pandas here anymore
     
-    klines = await get_historical_klines(symbol, interval, start_str, end_str)
+    klines = await get_historical_klines_parallel(symbol, interval, start_str, end_str)
     if klines is None:
         return None
         
     try:
-        df = pd.DataFrame(klines, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume', 
-            'close_time', 'quote_asset_volume', 'number_of_trades', 
-            'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-        ])
-        # Convert timestamp to datetime and set as index
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
-        # Convert relevant columns to numeric types
-        numeric_cols = ['open', 'high', 'low', 'close', 'volume', 'quote_asset_volume', 'number_of_trades', 
-                        'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume']
-        df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
+        # Kline rows: [open_time, open, high, low, close, volume, close_time, ...]. Parse only the
+        # open time and OHLCV columns straight into one float64 block (the other six are never read)
+        rows = np.asarray(klines, dtype=object).reshape(len(klines), KLINE_FIELDS)
+        open_times = pd.to_datetime(rows[:, 0].astype(np.int64), unit='ms')
+        df = pd.DataFrame(
+            rows[:, 1:6].astype(np.float64),
+            columns=['open', 'high', 'low', 'close', 'volume'],
+            index=pd.DatetimeIndex(open_times, name='timestamp')
+        )
         
-        # Select and return only the most common columns, or keep all? Let's keep common ones.
-        df = df[['open', 'high', 'low', 'close', 'volume']] 
-        
-        logger.info(f"Successfully created DataFrame with {len(df)} rows for {symbol} klines.")
+        logging.info(f"Successfully created DataFrame with {len(df)} rows for {symbol} klines.")
         return df
     except Exception as e:
-        logger.error(f"Error converting klines to DataFrame for {symbol}: {e}", exc_info=True)
+        logging.error(f"Error converting klines to DataFrame for {symbol}: {e}", exc_info=True)
         return None
 
 # --- Modify other functions similarly to use `await get_binance_client()` ---
 
 async def get_order_status(symbol: str, order_id: str) -> Optional[Dict]:
     """Fetches the status of a specific order."""
-    client = await get_binance_client()
-    if not client:
-        logging.error("Cannot get order status: Binance client not available.")
-        return None
-    
-    loop = asyncio.get_event_loop()
     try:
         logging.debug(f"Fetching status for order {order_id} on {symbol}")
-        # Use keyword arguments for get_order
-        order_status = await loop.run_in_executor(None, lambda: client.get_order(symbol=symbol, orderId=order_id))
+        async with REQUEST_LIMITER:
+            order_status = await binance_async.get_order(symbol=symbol, orderId=order_id)
         return order_status
     except BinanceAPIException as e:
         # Handle specific errors, e.g., order not found (might not be an error in some cases)
@@ -178,6 +321,61 @@ async def get_order_status(symbol: str, order_id: str) -> Optional[Dict]:
         logging.error(f"Unexpected error fetching order status for {order_id}: {e}", exc_info=True)
         return None
 
+async def get_open_orders(symbol: str) -> Optional[list]:
+    """Fetches all currently open orders for a symbol in a single request."""
+    try:
+        logging.debug(f"Fetching open orders for {symbol}")
+        async with REQUEST_LIMITER:
+            open_orders = await binance_async.get_open_orders(symbol=symbol)
+        return open_orders
+    except BinanceAPIException as e:
+        logging.error(f"Binance API Error fetching open orders for {symbol}: {e}")
+        return None
+    except Exception as e:
+        logging.error(f"Unexpected error fetching open orders for {symbol}: {e}", exc_info=True)
+        return None
+
+async def cancel_all_open_orders(symbol: str) -> Optional[list]:
+    """
+    Cancels every open order on a symbol with a single signed DELETE /api/v3/openOrders request.
+    Returns the list of cancelled orders (empty if none were open), or None on failure.
+    """
+    try:
+        logging.info(f"Cancelling all open orders for {symbol}")
+        async with REQUEST_LIMITER:
+            cancelled = await binance_async.cancel_open_orders(symbol=symbol)
+        return cancelled or []
+    except BinanceAPIException as e:
+        if e.code == -2011: # No open orders to cancel
+            logging.info(f"No open orders to cancel for {symbol}.")
+            return []
+        logging.error(f"Binance API Error cancelling open orders for {symbol}: {e}")
+        return None
+    except Exception as e:
+        logging.error(f"Unexpected error cancelling open orders for {symbol}: {e}", exc_info=True)
+        return None
+
+def start_user_data_stream(callback) -> Optional[ThreadedWebsocketManager]:
+    """
+    Starts a Binance user-data WebSocket stream on a background thread.
+    `callback` receives each raw event dict (e.g. 'executionReport') on that thread.
+    The manager keeps the listenKey alive; call `.stop()` on the returned manager to close it.
+    """
+    api_key = os.getenv("BINANCE_TESTNET_API_KEY")
+    api_secret = os.getenv("BINANCE_TESTNET_API_SECRET")
+    if not api_key or not api_secret:
+        logging.error("Cannot start user data stream: Binance API Key or Secret not found.")
+        return None
+    try:
+        twm = ThreadedWebsocketManager(api_key=api_key, api_secret=api_secret, testnet=True)
+        twm.start()
+        twm.start_user_socket(callback=callback)
+        logging.info("Binance user data stream started.")
+        return twm
+    except Exception as e:
+        logging.error(f"Failed to start Binance user data stream: {e}", exc_info=True)
+        return None
+
 # Add more functions here for:
 # - Cancelling orders
 # - Getting account balance
@@ -1,69 +1,267 @@
 import os
 import logging
 import asyncio # Need asyncio for the lock
+import datetime
+import functools
+import json
 import uuid # Import uuid
+from dataclasses import dataclass, field
+from decimal import Decimal
 from supabase import create_client, AsyncClient # Import from the correct package
 from supabase.lib.client_options import ClientOptions # Import from the correct package path
 from dotenv import load_dotenv
-from typing import Optional, Dict, Any # Import Dict, Any
+from typing import Optional, Dict, Any, List, Callable # Import Dict, Any
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+try:
+    import asyncpg
+except ImportError: # asyncpg is optional; without it bot writes go through PostgREST
+    asyncpg = None
+
+# Handlers are configured by the app entrypoint (utils.logging_setup.setup_logging)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
+# --- Configuration ---
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
-load_dotenv(dotenv_path=dotenv_path)
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-# Use Service Role Key for backend operations where RLS might need bypassing
-# or for operations not tied to a specific user session (e.g., admin tasks, migrations)
-# WARNING: Handle the service key with extreme care. Do not expose it client-side.
-SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY") 
+@dataclass(frozen=True, slots=True)
+class BackendConfig:
+    url: str
+    # Use Service Role Key for backend operations where RLS might need bypassing
+    # or for operations not tied to a specific user session (e.g., admin tasks, migrations)
+    # WARNING: Handle the service key with extreme care. Do not expose it client-side.
+    service_key: str = field(repr=False)
+    db_url: Optional[str] = field(default=None, repr=False) # Direct Postgres connection string (Supabase pooler endpoint) for bot writes; optional
 
-if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
-    logger.error("Supabase URL or Service Key not found in environment variables.")
-    # Raise an error or handle appropriately, as the backend client is crucial
-    raise EnvironmentError("Missing Supabase URL or Service Key for backend client.")
+@functools.lru_cache(maxsize=1)
+def _config() -> BackendConfig:
+    """Loads the .env file and reads the Supabase settings once; later calls return the cached config."""
+    load_dotenv(dotenv_path=dotenv_path, override=False)
+    url = os.getenv("SUPABASE_URL")
+    service_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not url or not service_key:
+        logger.error("Supabase URL or Service Key not found in environment variables.")
+        # Raise an error or handle appropriately, as the backend client is crucial
+        raise EnvironmentError("Missing Supabase URL or Service Key for backend client.")
+    return BackendConfig(url=url, service_key=service_key, db_url=os.getenv("SUPABASE_DB_URL"))
 
-# --- Global variable to hold the client instance ---
-_supabase_backend_client: Optional[AsyncClient] = None
-_client_lock = asyncio.Lock() # Lock for thread-safe initialization
+_config() # Fail at import if the backend client can't be configured
 
-async def get_supabase_backend_client() -> AsyncClient:
+# --- Backend client, built once on first use ---
+# create_client is synchronous, so the cached factory needs no lock: concurrent coroutines can't interleave
+# inside it, and once built every call is a plain cache hit. Failures aren't cached, so the next call retries.
+@functools.cache
+def get_supabase_backend_client() -> AsyncClient:
+    """
+    Lazily initializes and returns the Supabase client instance for backend use.
+    Uses the Service Role Key.
     """
-    Lazily initializes and returns the Supabase async client instance for backend use.
-    Uses the Service Role Key. Ensures thread-safe initialization.
+    logger.info("Initializing Supabase backend client...")
+    try:
+        # Using supabase-py (v2+) which includes async client
+        options: ClientOptions = ClientOptions(
+            # persist_session=False, # Typically false for backend service clients
+            # auto_refresh_token=False 
+        )
+        # create_client returns both sync and async, we need AsyncClient type hint
+        client: AsyncClient = create_client( 
+            _config().url, 
+            _config().service_key, 
+            options=options
+        )
+        logger.info("Supabase backend client initialized successfully.")
+        return client
+    except Exception as e:
+        logger.error(f"Failed to initialize Supabase backend client: {e}", exc_info=True)
+        # Depending on the error, might want to raise it to prevent app startup
+        raise RuntimeError("Could not initialize Supabase backend client.") from e
+
+async def _execute(query):
     """
-    global _supabase_backend_client
-    
-    if _supabase_backend_client:
-        return _supabase_backend_client
-
-    async with _client_lock:
-        if _supabase_backend_client:
-            return _supabase_backend_client
-            
-        logger.info("Initializing Supabase backend client...")
+    Runs a supabase query builder's blocking execute() on the default executor. The client from create_client
+    is synchronous, so awaiting execute() directly would block the event loop and then fail.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, query.execute)
+
+# --- Direct Postgres Pool ---
+# Bot writes (trades, performance snapshots) skip the PostgREST HTTP/JSON layer when asyncpg is installed
+# and SUPABASE_DB_URL is set, going over pooled connections instead. Everything else stays on PostgREST.
+_pg_pool: Optional["asyncpg.Pool"] = None
+# Created on first use and recreated if the running loop changes, so it never binds to a loop at import
+_pg_pool_lock: Optional[asyncio.Lock] = None
+_pg_pool_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _get_pg_pool_lock() -> asyncio.Lock:
+    global _pg_pool_lock, _pg_pool_lock_loop
+    loop = asyncio.get_running_loop()
+    if _pg_pool_lock is None or _pg_pool_lock_loop is not loop:
+        _pg_pool_lock = asyncio.Lock()
+        _pg_pool_lock_loop = loop
+    return _pg_pool_lock
+
+async def get_pg_pool() -> Optional["asyncpg.Pool"]:
+    """Lazily creates and returns the asyncpg pool, or None if direct Postgres access isn't configured."""
+    global _pg_pool
+
+    if _pg_pool or asyncpg is None or not _config().db_url:
+        return _pg_pool
+
+    async with _get_pg_pool_lock():
+        if _pg_pool:
+            return _pg_pool
+        logger.info("Initializing Postgres connection pool...")
         try:
-            # Using supabase-py (v2+) which includes async client
-            options: ClientOptions = ClientOptions(
-                # persist_session=False, # Typically false for backend service clients
-                # auto_refresh_token=False 
+            # Supabase's pooler runs in transaction mode, so prepared statements can't be reused across calls
+            _pg_pool = await asyncpg.create_pool(
+                dsn=_config().db_url, min_size=10, max_size=50,
+                max_inactive_connection_lifetime=300, statement_cache_size=0,
+                server_settings={"application_name": "trading-bots"}
             )
-            # create_client returns both sync and async, we need AsyncClient type hint
-            client: AsyncClient = create_client( 
-                SUPABASE_URL, 
-                SUPABASE_SERVICE_KEY, 
-                options=options
-            )
-            _supabase_backend_client = client
-            logger.info("Supabase backend client initialized successfully.")
-            return _supabase_backend_client
+            logger.info("Postgres connection pool initialized successfully.")
         except Exception as e:
-            logger.error(f"Failed to initialize Supabase backend client: {e}", exc_info=True)
-            # Depending on the error, might want to raise it to prevent app startup
-            raise RuntimeError("Could not initialize Supabase backend client.") from e
+            logger.error(f"Failed to initialize Postgres connection pool, falling back to PostgREST: {e}", exc_info=True)
+        return _pg_pool
+
+async def close_pg_pool():
+    global _pg_pool
+    if _pg_pool:
+        await _pg_pool.close()
+        _pg_pool = None
+
+# asyncpg parameter conversions for the columns PostgREST would otherwise coerce from JSON
+def _pg_numeric(value):
+    return None if value is None else Decimal(str(value)) # Via str, so 0.1 is stored as 0.1
+
+def _pg_timestamptz(value):
+    return datetime.datetime.fromisoformat(value) if isinstance(value, str) else value
+
+def _pg_jsonb(value):
+    return None if value is None else json.dumps(value)
+
+def _pg_int(value):
+    return None if value is None else int(value)
+
+# --- Batched Inserts ---
+# Trades and performance snapshots are written in bulk: rows are validated and buffered in memory,
+# and a background task inserts each table's buffer with a single request every DB_FLUSH_INTERVAL
+# seconds, or as soon as DB_BATCH_SIZE rows are waiting. flush_db_buffers() writes out what is waiting;
+# close_db_buffers() also stops the background tasks and is called at shutdown.
+DB_FLUSH_INTERVAL = 1.0
+DB_BATCH_SIZE = 500
+
+class _BatchInserter:
+    """
+    Buffers rows for one table and inserts them in batches from a background task.
+    `columns` maps each column to the converter applied to its values for asyncpg (None to pass as is).
+    The event, lock and flusher task belong to the loop that last used the inserter and are rebuilt if it changes.
+    """
+    def __init__(
+        self, table: str, columns: Dict[str, Optional[Callable[[Any], Any]]],
+        batch_size: int = DB_BATCH_SIZE, flush_interval: float = DB_FLUSH_INTERVAL
+    ):
+        self.table = table
+        self.columns = columns
+        column_list = ", ".join(f'"{column}"' for column in columns)
+        placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+        self._insert_sql = f"INSERT INTO public.{table} ({column_list}) VALUES ({placeholders})"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._rows: List[Dict[str, Any]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None # Serializes inserts so flush() returns only once buffered rows are written
+        self._flusher_task: Optional[asyncio.Task] = None
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # A task left over from a closed loop is never done(), so it is dropped rather than checked
+            self._loop = loop
+            self._batch_full = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._flusher_task = None
+
+    def put(self, row: Dict[str, Any]):
+        self._bind_loop()
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self._batch_full.set()
+        if self._flusher_task is None or self._flusher_task.done():
+            self._flusher_task = self._loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_full.clear()
+            # Shielded so close() cancelling the task can't drop a batch that was already detached
+            await asyncio.shield(self.flush())
+
+    async def flush(self):
+        self._bind_loop()
+        async with self._flush_lock:
+            while self._rows:
+                # Detach the batch before awaiting so rows added meanwhile go into the next one
+                batch = self._rows[:self.batch_size]
+                del self._rows[:self.batch_size]
+                await self._insert(batch)
+
+    async def close(self):
+        """Stops the background flusher, then writes out whatever is still buffered."""
+        self._bind_loop()
+        task, self._flusher_task = self._flusher_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+    def to_records(self, rows: List[Dict[str, Any]]) -> List[tuple]:
+        """Converts row dicts into tuples in `columns` order, with each column's asyncpg conversion applied."""
+        converters = list(self.columns.items())
+        return [
+            tuple(row.get(column) if convert is None else convert(row.get(column)) for column, convert in converters)
+            for row in rows
+        ]
+
+    async def _insert(self, rows: List[Dict[str, Any]]):
+        try:
+            pool = await get_pg_pool()
+            if pool is not None:
+                await pool.executemany(self._insert_sql, self.to_records(rows))
+                logger.info("Recorded %d rows into '%s'.", len(rows), self.table)
+                return
+            supabase = get_supabase_backend_client()
+            response = await _execute(supabase.table(self.table).insert(rows))
+            inserted = len(response.data) if response.data else 0
+            if inserted and inserted != len(rows):
+                logger.warning("Supabase insert into '%s' returned %d of %d rows.", self.table, inserted, len(rows))
+            else:
+                logger.info("Recorded %d rows into '%s'.", len(rows), self.table)
+        except Exception as e:
+            logger.error(f"Unexpected error inserting {len(rows)} rows into '{self.table}': {e}", exc_info=True)
+
+_trade_buffer = _BatchInserter('trades', {
+    "bot_config_id": None, "user_id": None, "binance_order_id": None, "symbol": None, "side": None, "type": None,
+    "price": _pg_numeric, "quantity": _pg_numeric, "commission": _pg_numeric, "commission_asset": None,
+    "timestamp": _pg_timestamptz,
+})
+_perf_buffer = _BatchInserter('performance', {
+    "bot_config_id": None, "user_id": None, "timestamp": _pg_timestamptz, "total_pnl": _pg_numeric,
+    "total_trades": _pg_int, "win_rate": _pg_numeric, "portfolio_value": _pg_numeric, "metrics": _pg_jsonb,
+})
+
+async def flush_db_buffers():
+    """Writes out all buffered trades and performance snapshots."""
+    await asyncio.gather(_trade_buffer.flush(), _perf_buffer.flush())
+
+async def close_db_buffers():
+    """Stops the background flushers after writing out all buffered rows. Call once at shutdown."""
+    await asyncio.gather(_trade_buffer.close(), _perf_buffer.close())
 
 # --- Database Interaction Functions ---
 
@@ -73,7 +271,7 @@ async def record_trade(
     trade_data: dict
 ) -> bool: # Return boolean indicating success
     """
-    Records an executed trade into the 'trades' table.
+    Queues an executed trade for batched insertion into the 'trades' table.
 
     Args:
         bot_config_id (uuid.UUID): The ID of the bot configuration that executed the trade.
@@ -84,10 +282,8 @@ async def record_trade(
                            'commission_asset', 'timestamp').
                            
     Returns:
-        bool: True if recording was successful, False otherwise.
+        bool: True if the trade was valid and queued, False otherwise.
     """
-    supabase = await get_supabase_backend_client()
-    
     # Prepare data for insertion, ensuring required fields are present
     insert_payload = {
         "bot_config_id": str(bot_config_id),
@@ -110,25 +306,13 @@ async def record_trade(
         logger.error(f"Missing required fields for recording trade: {missing_fields}")
         return False # Indicate failure
 
-    try:
-        logger.info(f"Recording trade for bot {bot_config_id}: {insert_payload['side']} {insert_payload['quantity']} {insert_payload['symbol']} @ {insert_payload['price']}")
-        # Use service role key implicitly via the backend client
-        response = await supabase.table('trades').insert(insert_payload).execute()
-        
-        if response.error:
-            logger.error(f"Supabase error recording trade: {response.error}")
-            return False
-        elif not response.data:
-             logger.warning("Supabase insert for trade returned no data, but no error. Assuming success.")
-             # Insert might return no data on success depending on settings
-             return True
-        else:
-            logger.info(f"Successfully recorded trade with ID: {response.data[0].get('id')}")
-            return True # Indicate success
-
-    except Exception as e:
-        logger.error(f"Unexpected error recording trade: {e}", exc_info=True)
-        return False
+    # %-style args on the per-trade path: nothing is formatted when INFO is filtered out
+    logger.info(
+        "Queueing trade for bot %s: %s %s %s @ %s", bot_config_id,
+        insert_payload['side'], insert_payload['quantity'], insert_payload['symbol'], insert_payload['price']
+    )
+    _trade_buffer.put(insert_payload)
+    return True
 
 async def record_performance_snapshot(
     bot_config_id: uuid.UUID, 
@@ -136,7 +320,7 @@ async def record_performance_snapshot(
     performance_data: Dict[str, Any]
 ) -> bool:
     """
-    Records a performance snapshot into the 'performance' table.
+    Queues a performance snapshot for batched insertion into the 'performance' table.
 
     Args:
         bot_config_id (uuid.UUID): The ID of the bot configuration.
@@ -146,10 +330,58 @@ async def record_performance_snapshot(
                                            'win_rate', 'portfolio_value', 'metrics' (jsonb).
 
     Returns:
-        bool: True if recording was successful, False otherwise.
+        bool: True if the snapshot was valid and queued, False otherwise.
+    """
+    insert_payload = _performance_payload(bot_config_id, user_id, performance_data)
+    if insert_payload is None:
+        return False
+
+    logger.info("Queueing performance snapshot for bot %s at %s", bot_config_id, insert_payload['timestamp'])
+    _perf_buffer.put(insert_payload)
+    return True
+
+async def bulk_record_performance(
+    bot_config_id: uuid.UUID,
+    user_id: uuid.UUID,
+    snapshots: List[Dict[str, Any]]
+) -> int:
     """
-    supabase = await get_supabase_backend_client()
+    Backfills many performance snapshots at once, e.g. when recovering or importing history.
+    With the Postgres pool they are streamed in a single binary COPY; otherwise they are inserted through
+    PostgREST in DB_BATCH_SIZE chunks. The live path (record_performance_snapshot) is unaffected.
 
+    Args:
+        bot_config_id (uuid.UUID): The ID of the bot configuration.
+        user_id (uuid.UUID): The ID of the user who owns the bot.
+        snapshots (List[Dict[str, Any]]): Performance dictionaries with the same keys as record_performance_snapshot's.
+
+    Returns:
+        int: The number of snapshots written; 0 if any snapshot is invalid or the write fails.
+    """
+    payloads = [_performance_payload(bot_config_id, user_id, snapshot) for snapshot in snapshots]
+    if not payloads or any(payload is None for payload in payloads):
+        return 0
+
+    try:
+        pool = await get_pg_pool()
+        if pool is not None:
+            async with pool.acquire() as conn:
+                await conn.copy_records_to_table(
+                    'performance', schema_name='public',
+                    records=_perf_buffer.to_records(payloads), columns=list(_perf_buffer.columns)
+                )
+        else:
+            supabase = get_supabase_backend_client()
+            for start in range(0, len(payloads), DB_BATCH_SIZE):
+                await _execute(supabase.table('performance').insert(payloads[start:start + DB_BATCH_SIZE]))
+        logger.info(f"Backfilled {len(payloads)} performance snapshots for bot {bot_config_id}.")
+        return len(payloads)
+    except Exception as e:
+        logger.error(f"Unexpected error backfilling performance snapshots for bot {bot_config_id}: {e}", exc_info=True)
+        return 0
+
+def _performance_payload(bot_config_id: uuid.UUID, user_id: uuid.UUID, performance_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Builds a 'performance' row from a snapshot dict, or returns None if required fields are missing."""
     insert_payload = {
         "bot_config_id": str(bot_config_id),
         "user_id": str(user_id),
@@ -166,30 +398,44 @@ async def record_performance_snapshot(
     missing_fields = [field for field in required_fields if insert_payload.get(field) is None]
     if missing_fields:
         logger.error(f"Missing required fields for recording performance snapshot: {missing_fields}")
-        return False
+        return None
+    return insert_payload
+
+
+async def get_latest_trade(
+    bot_config_id: uuid.UUID,
+    side: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Fetches the most recent trade recorded for a bot configuration.
+
+    Args:
+        bot_config_id (uuid.UUID): The ID of the bot configuration.
+        side (str, optional): Restrict the lookup to 'BUY' or 'SELL' trades.
+
+    Returns:
+        Optional[Dict[str, Any]]: The latest trade row, or None if no trade exists or an error occurs.
+    """
+    supabase = get_supabase_backend_client()
 
     try:
-        logger.info(f"Recording performance snapshot for bot {bot_config_id} at {insert_payload['timestamp']}")
-        response = await supabase.table('performance').insert(insert_payload).execute()
-
-        if response.error:
-            logger.error(f"Supabase error recording performance snapshot: {response.error}")
-            return False
-        elif not response.data:
-             logger.warning("Supabase insert for performance snapshot returned no data, but no error. Assuming success.")
-             return True
-        else:
-            logger.info(f"Successfully recorded performance snapshot with ID: {response.data[0].get('id')}")
-            return True
+        query = supabase.table('trades').select('*').eq('bot_config_id', str(bot_config_id))
+        if side:
+            query = query.eq('side', side)
+        response = await _execute(query.order('timestamp', desc=True).limit(1))
+
+        if response.data:
+            return response.data[0]
+        return None
 
     except Exception as e:
-        logger.error(f"Unexpected error recording performance snapshot: {e}", exc_info=True)
-        return False
+        logger.error(f"Unexpected error fetching latest trade for bot {bot_config_id}: {e}", exc_info=True)
+        return None
 
 
 # --- Example Usage (within other backend modules) ---
 # async def example_db_call():
-#     supabase = await get_supabase_backend_client()
+#     supabase = get_supabase_backend_client()
 #     try:
 #         response = await supabase.table('your_table').select("*").eq('some_column', 'some_value').execute()
 #         logger.info(f"Supabase response: {response}")
@@ -1,6 +1,7 @@
+import functools
 import numpy as np
 import logging
-from typing import List, Tuple
+from typing import List, Sequence, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
@@ -8,8 +9,9 @@ def calculate_grid_levels(
     lower_bound: float, 
     upper_bound: float, 
     num_grids: int, 
-    mode: str = 'arithmetic'
-) -> List[float]:
+    mode: str = 'arithmetic',
+    as_array: bool = False
+) -> Union[List[float], np.ndarray]:
     """
     Calculates the price levels for a grid trading strategy.
 
@@ -18,13 +20,25 @@ def calculate_grid_levels(
         upper_bound (float): The upper price boundary of the grid.
         num_grids (int): The number of grid lines (levels) to create.
         mode (str): The mode for calculating levels ('arithmetic' or 'geometric').
+        as_array (bool): Return a read-only float64 array (shared with the cache, not copied) instead of a list.
 
     Returns:
-        List[float]: A sorted list of grid price levels.
+        Union[List[float], np.ndarray]: The sorted grid price levels.
         
     Raises:
         ValueError: If inputs are invalid (e.g., bounds reversed, num_grids <= 0).
     """
+    # Results are memoized per config; round float args so tiny representation differences still hit
+    levels = _calculate_grid_levels_cached(round(lower_bound, 10), round(upper_bound, 10), num_grids, mode)
+    return levels if as_array else levels.tolist()
+
+@functools.lru_cache(maxsize=1024)
+def _calculate_grid_levels_cached(
+    lower_bound: float,
+    upper_bound: float,
+    num_grids: int,
+    mode: str
+) -> np.ndarray:
     if lower_bound >= upper_bound:
         logger.error("Grid lower bound must be less than upper bound.")
         raise ValueError("Grid lower bound must be less than upper bound.")
@@ -32,79 +46,89 @@ def calculate_grid_levels(
         logger.error("Number of grids must be positive.")
         raise ValueError("Number of grids must be positive.")
         
-    levels = []
     if mode == 'arithmetic':
         if num_grids == 1:
              # Special case: single grid line often means trading around a central price
              # Or could place it at the midpoint. Let's place at midpoint for now.
-             levels = [(lower_bound + upper_bound) / 2]
+             levels = np.array([(lower_bound + upper_bound) / 2])
         else:
-            step = (upper_bound - lower_bound) / (num_grids -1) if num_grids > 1 else 0
-            levels = [lower_bound + i * step for i in range(num_grids)]
+            levels = np.linspace(lower_bound, upper_bound, num_grids)
             
     elif mode == 'geometric':
         if lower_bound <= 0:
              logger.error("Geometric grid requires lower_bound > 0.")
              raise ValueError("Geometric grid requires lower_bound > 0.")
         if num_grids == 1:
-             levels = [np.sqrt(lower_bound * upper_bound)] # Geometric mean
+             levels = np.array([np.sqrt(lower_bound * upper_bound)]) # Geometric mean
         else:
-             # Ratio between consecutive levels
-             ratio = (upper_bound / lower_bound) ** (1 / (num_grids - 1)) if num_grids > 1 else 1
-             levels = [lower_bound * (ratio ** i) for i in range(num_grids)]
+             # Constant ratio between consecutive levels
+             levels = np.geomspace(lower_bound, upper_bound, num_grids)
              
     else:
         logger.error(f"Unsupported grid mode: {mode}")
         raise ValueError(f"Unsupported grid mode: {mode}. Choose 'arithmetic' or 'geometric'.")
 
-    # Ensure bounds are included precisely if needed, handle potential float inaccuracies
-    levels = sorted(list(set(levels))) # Remove duplicates and sort
+    # Strictly increasing by construction (lower_bound < upper_bound), with both bounds hit exactly
     logger.info(f"Calculated {len(levels)} grid levels using {mode} mode between {lower_bound} and {upper_bound}.")
     
-    # Optional: Round levels to appropriate precision based on asset?
-    # levels = [round(level, price_precision) for level in levels]
+    # Optional: Round levels to appropriate precision based on asset? Rounding can merge neighbouring levels,
+    # so collapse them in the same pass (np.unique also returns them sorted):
+    # levels = np.unique(np.round(levels, price_precision))
     
+    levels.flags.writeable = False # Shared by every caller that hits the cache
     return levels
 
 def calculate_order_quantities(
     total_investment: float,
-    grid_levels: List[float],
+    grid_levels: Sequence[float],
     current_price: float,
-    mode: str = 'equal_value' # or 'equal_quantity'
-) -> List[Tuple[float, float]]:
+    mode: str = 'equal_value', # or 'equal_quantity'
+    as_array: bool = False
+) -> Union[List[Tuple[float, float]], np.ndarray]:
     """
     Calculates the quantity to buy/sell at each grid level.
     (Simplified initial version - assumes placing buy orders below current price)
 
     Args:
         total_investment (float): The total amount of quote currency to invest across the grid.
-        grid_levels (List[float]): The calculated grid price levels.
+        grid_levels (Sequence[float]): The calculated grid price levels (a list, array or tuple; a tuple avoids a copy).
         current_price (float): The current market price, used to determine which levels get buy orders.
         mode (str): How to distribute quantity ('equal_value' or 'equal_quantity').
+        as_array (bool): Return a read-only (N, 2) float64 array of (price_level, quantity_to_buy) rows
+                         (shared with the cache, not copied) instead of a list of tuples.
 
     Returns:
-        List[Tuple[float, float]]: A list of tuples (price_level, quantity_to_buy). 
+        Union[List[Tuple[float, float]], np.ndarray]: (price_level, quantity_to_buy) pairs.
                                     Only includes levels below the current price.
     """
+    if isinstance(grid_levels, tuple):
+        levels_key = grid_levels
+    elif isinstance(grid_levels, np.ndarray):
+        levels_key = tuple(grid_levels.tolist())
+    else:
+        levels_key = tuple(grid_levels)
+    orders = _calculate_order_quantities_cached(round(total_investment, 10), levels_key, round(current_price, 10), mode)
+    return orders if as_array else list(zip(orders[:, 0].tolist(), orders[:, 1].tolist()))
+
+@functools.lru_cache(maxsize=4096)
+def _calculate_order_quantities_cached(
+    total_investment: float,
+    grid_levels: Tuple[float, ...],
+    current_price: float,
+    mode: str
+) -> np.ndarray:
     if total_investment <= 0:
         raise ValueError("Total investment must be positive.")
         
-    buy_levels = [level for level in grid_levels if level < current_price]
-    num_buy_orders = len(buy_levels)
+    levels = np.asarray(grid_levels, dtype=np.float64)
+    buy_levels = levels[levels < current_price]
+    num_buy_orders = buy_levels.size
 
     if num_buy_orders == 0:
         logger.warning("No grid levels below current price. No buy orders calculated.")
-        return []
-
-    orders = []
-    if mode == 'equal_value':
-        # Each buy order uses an equal amount of the quote currency
-        value_per_order = total_investment / num_buy_orders
-        for level in buy_levels:
-            quantity = value_per_order / level
-            orders.append((level, quantity))
-            
-    elif mode == 'equal_quantity':
+        return np.empty((0, 2))
+
+    if mode == 'equal_quantity':
         # Requires calculating total quantity first, more complex if value is fixed.
         # Let's stick to equal_value for simplicity first.
         # If we wanted equal quantity of BASE asset per grid:
@@ -112,14 +136,14 @@ def calculate_order_quantities(
         # 2. Adjust quantity_per_level based on total_investment constraint.
         # This is less common for basic grids.
         logger.warning("Equal quantity mode not fully implemented yet. Using equal value.")
-        value_per_order = total_investment / num_buy_orders
-        for level in buy_levels:
-            quantity = value_per_order / level
-            orders.append((level, quantity))
-            
-    else:
+    elif mode != 'equal_value':
          raise ValueError("Unsupported order quantity mode.")
 
+    # Each buy order uses an equal amount of the quote currency (one array op over all buy levels)
+    quantities = (total_investment / num_buy_orders) / buy_levels
+    orders = np.column_stack((buy_levels, quantities))
+    orders.flags.writeable = False # Shared by every caller that hits the cache
+
     logger.info(f"Calculated {len(orders)} buy orders for grid.")
     return orders
 
@@ -1,21 +1,51 @@
 import pandas as pd
 import numpy as np
 import logging
+from typing import Tuple, Union
+from numpy.typing import DTypeLike
+
+from ._indicator_kernels import _sma, _ema, _rsi, _macd, _momentum_state
+
+try:
+    from . import _indicators_native # Ahead-of-time build of the kernels (see _indicators_aot.py)
+except ImportError: # Not built; the @njit kernels compile on first use instead
+    _indicators_native = None
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-def calculate_sma(data: pd.Series, window: int) -> pd.Series:
+_JIT_KERNELS = {'sma': _sma, 'ema': _ema, 'rsi': _rsi, 'macd': _macd, 'momentum_state': _momentum_state}
+
+def _kernel(name: str, values: np.ndarray):
+    """The native kernel built for `values`' dtype if there is one, else the @njit kernel."""
+    return getattr(_indicators_native, f"{name}_{values.dtype.char}", None) or _JIT_KERNELS[name]
+
+# calculate_sma/ema/rsi/macd take a Series (and return Series/DataFrame on its index) or a 1D array
+# (and return arrays), so array callers skip building pandas objects.
+# `dtype` (float64 by default) sets the dtype the input is read as and the output is built in. np.float32
+# halves the bytes moved per bar for long series; the kernels keep their running state in float64, so
+# precision is bounded by float32 rounding of the inputs and outputs (~1e-7 relative) however long the series.
+SeriesOrArray = Union[pd.Series, np.ndarray]
+
+def _values(data: SeriesOrArray, dtype: DTypeLike = np.float64) -> np.ndarray:
+    values = data.to_numpy() if isinstance(data, pd.Series) else data
+    return np.ascontiguousarray(values, dtype=dtype)
+
+def _wrap(data: SeriesOrArray, values: np.ndarray) -> SeriesOrArray:
+    return pd.Series(values, index=data.index) if isinstance(data, pd.Series) else values
+
+def calculate_sma(data: SeriesOrArray, window: int, dtype: DTypeLike = np.float64) -> SeriesOrArray:
     """Calculates the Simple Moving Average (SMA)."""
     if window <= 0:
         logger.error("SMA window must be positive.")
         raise ValueError("SMA window must be positive.")
     if len(data) < window:
         logger.warning(f"Data length ({len(data)}) is less than SMA window ({window}). Returning NaNs.")
-        return pd.Series([np.nan] * len(data), index=data.index)
-    return data.rolling(window=window, min_periods=window).mean()
+        return _wrap(data, np.full(len(data), np.nan, dtype=dtype))
+    values = _values(data, dtype)
+    return _wrap(data, _kernel('sma', values)(values, window))
 
-def calculate_ema(data: pd.Series, window: int) -> pd.Series:
+def calculate_ema(data: SeriesOrArray, window: int, dtype: DTypeLike = np.float64) -> SeriesOrArray:
     """Calculates the Exponential Moving Average (EMA)."""
     if window <= 0:
         logger.error("EMA window must be positive.")
@@ -23,42 +53,29 @@ def calculate_ema(data: pd.Series, window: int) -> pd.Series:
     if len(data) < window:
          logger.warning(f"Data length ({len(data)}) is less than EMA window ({window}). Returning NaNs.")
          # EMA calculation needs sufficient data; returning NaNs might be safer than partial calculation
-         return pd.Series([np.nan] * len(data), index=data.index)
+         return _wrap(data, np.full(len(data), np.nan, dtype=dtype))
     # Adjust=False matches common TA library behavior
-    return data.ewm(span=window, adjust=False, min_periods=window).mean()
+    values = _values(data, dtype)
+    return _wrap(data, _kernel('ema', values)(values, window))
 
-def calculate_rsi(data: pd.Series, window: int = 14) -> pd.Series:
+def calculate_rsi(data: SeriesOrArray, window: int = 14, dtype: DTypeLike = np.float64) -> SeriesOrArray:
     """Calculates the Relative Strength Index (RSI)."""
     if window <= 0:
         logger.error("RSI window must be positive.")
         raise ValueError("RSI window must be positive.")
     if len(data) < window + 1: # Need at least window+1 periods for delta calculation
         logger.warning(f"Data length ({len(data)}) insufficient for RSI window ({window}). Returning NaNs.")
-        return pd.Series([np.nan] * len(data), index=data.index)
+        return _wrap(data, np.full(len(data), np.nan, dtype=dtype))
 
-    delta = data.diff()
-    
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-
-    # Use EMA for average gain/loss calculation (common practice)
-    avg_gain = calculate_ema(gain, window)
-    avg_loss = calculate_ema(loss, window)
-    
-    # Handle division by zero if avg_loss is 0
-    rs = np.where(avg_loss == 0, np.inf, avg_gain / avg_loss)
-    
-    rsi = 100 - (100 / (1 + rs))
-    
-    # Set initial NaNs where calculation wasn't possible
-    rsi[:window] = np.nan 
-    
-    return rsi
+    # EMA-smoothed average gain/loss (common practice); RSI is 100 where avg loss is 0
+    values = _values(data, dtype)
+    return _wrap(data, _kernel('rsi', values)(values, window))
 
-def calculate_macd(data: pd.Series, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> pd.DataFrame:
+def calculate_macd(data: SeriesOrArray, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9, dtype: DTypeLike = np.float64) -> Union[pd.DataFrame, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
     """
     Calculates the Moving Average Convergence Divergence (MACD).
-    Returns a DataFrame with 'MACD', 'Signal', and 'Histogram' columns.
+    Returns a DataFrame with 'MACD', 'Signal', and 'Histogram' columns,
+    or a (macd, signal, histogram) tuple of arrays when `data` is an array.
     """
     if not (fast_period > 0 and slow_period > 0 and signal_period > 0):
         logger.error("MACD periods must be positive.")
@@ -68,16 +85,16 @@ def calculate_macd(data: pd.Series, fast_period: int = 12, slow_period: int = 26
          raise ValueError("MACD fast_period must be less than slow_period.")
     if len(data) < slow_period:
         logger.warning(f"Data length ({len(data)}) insufficient for MACD slow period ({slow_period}). Returning NaNs.")
+        if not isinstance(data, pd.Series):
+            return tuple(np.full(len(data), np.nan, dtype=dtype) for _ in range(3))
         # Create DataFrame with NaNs
-        nan_series = pd.Series([np.nan] * len(data), index=data.index)
+        nan_series = pd.Series(np.full(len(data), np.nan, dtype=dtype), index=data.index)
         return pd.DataFrame({'MACD': nan_series, 'Signal': nan_series, 'Histogram': nan_series})
 
-    ema_fast = calculate_ema(data, fast_period)
-    ema_slow = calculate_ema(data, slow_period)
-    
-    macd_line = ema_fast - ema_slow
-    signal_line = calculate_ema(macd_line, signal_period)
-    histogram = macd_line - signal_line
+    values = _values(data, dtype)
+    macd_line, signal_line, histogram = _kernel('macd', values)(values, fast_period, slow_period, signal_period)
+    if not isinstance(data, pd.Series):
+        return macd_line, signal_line, histogram
     
     # Create result DataFrame
     macd_df = pd.DataFrame({
@@ -91,6 +108,25 @@ def calculate_macd(data: pd.Series, fast_period: int = 12, slow_period: int = 26
     
     return macd_df
 
+def calculate_momentum_state(close: np.ndarray, rsi_period: int = 14, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> tuple:
+    """
+    Returns the final RSI/MACD recurrence state over a float64 close array, for seeding streaming updates:
+    (avg_gain, avg_loss, ema_fast, ema_slow, macd_signal). Same smoothing as calculate_rsi/calculate_macd.
+    """
+    if len(close) < slow_period:
+        raise ValueError(f"Need at least {slow_period} closes to seed MACD state, got {len(close)}.")
+    return _kernel('momentum_state', close)(close, rsi_period, fast_period, slow_period, signal_period)
+
+def calculate_momentum_signals(rsi, macd, signal, rsi_oversold: float, rsi_overbought: float):
+    """
+    Evaluates the momentum strategy's entry/exit conditions without per-row branching.
+    Works on NumPy arrays (returning boolean masks) as well as on scalars.
+    Buy: RSI above oversold and MACD above signal. Sell: RSI below overbought or MACD below signal.
+    """
+    buy = (rsi > rsi_oversold) & (macd > signal)
+    sell = (rsi < rsi_overbought) | (macd < signal)
+    return buy, sell
+
 # --- Example Usage (for testing) ---
 if __name__ == '__main__':
     # Create sample data
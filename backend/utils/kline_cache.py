@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from .binance_client import get_recent_klines
+
+logger = logging.getLogger(__name__)
+
+class KlineCache:
+    """
+    Shares recent kline fetches between all bots in the process.
+    The last klines fetched for each (symbol, interval) are reused for `ttl` seconds, and concurrent
+    requests for the same key wait on a single in-flight fetch (single-flight) instead of issuing their own.
+    """
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[float, List[list]]] = {} # key -> (expires_at, klines)
+        self._inflight: Dict[Tuple[str, str], Tuple[int, asyncio.Future]] = {} # key -> (limit, future)
+
+    async def get_recent_klines(self, symbol: str, interval: str, limit: int, ttl: float) -> Optional[List[list]]:
+        """
+        Returns the most recent `limit` klines (last one still open), or None if the fetch failed.
+        The kline rows are shared between callers and must not be mutated.
+        """
+        key = (symbol, interval)
+        loop = asyncio.get_running_loop()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > loop.time() and len(entry[1]) >= limit:
+            return entry[1][-limit:]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] >= limit:
+            # Shield so a cancelled waiter doesn't cancel the fetch other bots are waiting on
+            klines = await asyncio.shield(inflight[1])
+            return klines[-limit:] if klines is not None else None
+
+        future = loop.create_future()
+        self._inflight[key] = (limit, future)
+        klines = None
+        try:
+            klines = await get_recent_klines(symbol, interval, limit=limit)
+            if klines:
+                self._entries[key] = (loop.time() + ttl, klines)
+        finally:
+            if self._inflight.get(key, (0, None))[1] is future:
+                del self._inflight[key]
+            if not future.done():
+                future.set_result(klines)
+        return klines
+
+# --- Process-wide cache shared by all bots ---
+kline_cache = KlineCache()
@@ -0,0 +1,98 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import pandas as pd
+from binance.helpers import convert_ts_str, interval_to_milliseconds
+
+try:
+    import pyarrow # noqa: F401 -- Parquet engine
+    _PARQUET_AVAILABLE = True
+except ImportError: # pyarrow is optional; without it every call goes to the exchange
+    _PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# One Parquet file per (symbol, interval), holding a contiguous run of *closed* candles.
+# Closed candles never change, so there is nothing to expire: a request is served from the file,
+# with only the part past the last cached candle (including any still-open candle) fetched fresh.
+# Defaults to backend/.cache/klines (git-ignored) rather than a path relative to wherever the server was started.
+KLINE_CACHE_DIR = Path(os.getenv("KLINE_CACHE_DIR", Path(__file__).resolve().parent.parent / ".cache" / "klines"))
+
+KlinesDfFetcher = Callable[..., Awaitable[Optional[pd.DataFrame]]]
+
+def _cache_path(symbol: str, interval: str) -> Path:
+    return KLINE_CACHE_DIR / f"{symbol}_{interval}.parquet"
+
+def _read(path: Path) -> Optional[pd.DataFrame]:
+    try:
+        return pd.read_parquet(path, engine='pyarrow')
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable kline cache file {path}: {e}")
+        return None
+
+def _write(path: Path, df: pd.DataFrame):
+    """Writes to a temp file, then atomically renames it over the cache file."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        df.to_parquet(tmp_path, engine='pyarrow', compression='zstd')
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.error(f"Failed to write kline cache file {path}: {e}")
+
+def _merge(cached: Optional[pd.DataFrame], fetched: pd.DataFrame, interval: pd.Timedelta) -> pd.DataFrame:
+    """Combines cached and freshly fetched candles if their ranges touch; otherwise the fetched ones replace the cache."""
+    if fetched.empty:
+        return fetched if cached is None else cached
+    if cached is None or cached.empty:
+        return fetched
+    if cached.index[0] > fetched.index[-1] + interval or cached.index[-1] < fetched.index[0] - interval:
+        return fetched
+    merged = pd.concat([cached, fetched])
+    return merged[~merged.index.duplicated(keep='last')].sort_index()
+
+def parquet_cached(fetch: KlinesDfFetcher) -> KlinesDfFetcher:
+    """
+    Wraps an async `fetch(symbol, interval, start_str, end_str=None)` returning an OHLCV DataFrame
+    indexed by candle open time, serving it from the on-disk Parquet cache where possible.
+    """
+    @functools.wraps(fetch)
+    async def wrapper(symbol: str, interval: str, start_str: str, end_str: str = None) -> Optional[pd.DataFrame]:
+        if not _PARQUET_AVAILABLE:
+            return await fetch(symbol, interval, start_str, end_str)
+
+        now_ms = int(time.time() * 1000)
+        start = pd.Timestamp(convert_ts_str(start_str), unit='ms')
+        end = pd.Timestamp(convert_ts_str(end_str) if end_str else now_ms, unit='ms')
+        step = pd.Timedelta(milliseconds=interval_to_milliseconds(interval))
+        path = _cache_path(symbol, interval)
+        loop = asyncio.get_event_loop()
+
+        cached = await loop.run_in_executor(None, _read, path)
+        if cached is not None and not cached.empty and cached.index[0] <= start <= cached.index[-1] + step:
+            if cached.index[-1] + step > end:
+                logger.info(f"Serving {symbol} {interval} klines from cache {path}")
+                return cached.loc[start:end]
+            # Head is cached; fetch only the candles after the last cached one
+            fetched = await fetch(symbol, interval, int((cached.index[-1] + step).value // 1_000_000), end_str)
+        else:
+            fetched = await fetch(symbol, interval, start_str, end_str)
+        if fetched is None:
+            return None
+
+        combined = _merge(cached, fetched, step)
+        # Only persist candles that had closed when they were fetched
+        closed = combined[combined.index + step <= pd.Timestamp(now_ms, unit='ms')]
+        if not closed.empty and (cached is None or not closed.equals(cached)):
+            await loop.run_in_executor(None, _write, path, closed)
+        return combined.loc[start:end]
+
+    return wrapper
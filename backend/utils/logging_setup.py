@@ -0,0 +1,42 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# --- Global listener draining the log queue on a background thread ---
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+def setup_logging(level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """
+    Routes all root logger output through a QueueHandler so that logging calls made
+    on the asyncio loop thread only enqueue records. A QueueListener on a background
+    thread performs the actual (blocking) writes to the configured handlers.
+    Safe to call more than once; subsequent calls return the running listener.
+    """
+    global _queue_listener
+
+    if _queue_listener:
+        return _queue_listener
+
+    root = logging.getLogger()
+    root.setLevel(level)
+
+    # Reuse any handlers already installed on the root logger, otherwise default to stderr
+    handlers = [h for h in root.handlers if not isinstance(h, logging.handlers.QueueHandler)]
+    if not handlers:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers = [stream_handler]
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _queue_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
+    atexit.register(_queue_listener.stop)
+    return _queue_listener
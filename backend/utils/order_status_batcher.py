@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
+
+from .binance_client import get_open_orders
+
+logger = logging.getLogger(__name__)
+
+class OpenOrdersBatcher:
+    """
+    Coalesces open-order lookups from all bots in the process.
+    Requests for the same symbol that arrive within `batch_interval` seconds (or until
+    `max_batch_size` waiters are queued) are fulfilled from a single get_open_orders call.
+    """
+    def __init__(self, batch_interval: float = 0.2, max_batch_size: int = 50):
+        self.batch_interval = batch_interval
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._batch_full: Dict[str, asyncio.Event] = {}
+        self._flush_tasks: Set[asyncio.Task] = set() # Keep references so tasks aren't garbage collected
+
+    async def get_open_orders(self, symbol: str) -> Optional[List[Dict]]:
+        """
+        Returns the open orders for `symbol`, or None if the fetch failed.
+        The returned list is shared between all waiters of the batch and must not be mutated.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        waiters = self._pending.get(symbol)
+        if waiters is None:
+            waiters = self._pending[symbol] = []
+            self._batch_full[symbol] = asyncio.Event()
+            task = loop.create_task(self._flush(symbol))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+        waiters.append(future)
+        if len(waiters) >= self.max_batch_size:
+            self._batch_full[symbol].set()
+        return await future
+
+    async def _flush(self, symbol: str):
+        try:
+            await asyncio.wait_for(self._batch_full[symbol].wait(), timeout=self.batch_interval)
+        except asyncio.TimeoutError:
+            pass
+
+        # Detach the batch before awaiting so new requests start the next one
+        waiters = self._pending.pop(symbol, [])
+        self._batch_full.pop(symbol, None)
+        logger.debug(f"Fetching open orders for {symbol} on behalf of {len(waiters)} waiters.")
+
+        try:
+            result = await get_open_orders(symbol)
+        except Exception as e:
+            logger.error(f"Unexpected error in batched open orders fetch for {symbol}: {e}", exc_info=True)
+            result = None
+
+        for future in waiters:
+            if not future.done():
+                future.set_result(result)
+
+# --- Process-wide batcher shared by all bots ---
+open_orders_batcher = OpenOrdersBatcher()